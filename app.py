@@ -1,31 +1,46 @@
 import dash
 import dash_mantine_components as dmc
-from dash import Dash, _dash_renderer, html, Input, Output, callback, clientside_callback
+from dash import Dash, _dash_renderer, dcc, html, Input, Output, callback, clientside_callback
 from dash_iconify import DashIconify
-from ploomber.spec import DAGSpec
 
+from database import pool_stats
+from etl_jobs import job_status, start_job
+from query_cache import cache_stats
 
-_dash_renderer._set_react_version("18.2.0")
 
+_dash_renderer._set_react_version("18.2.0")
 
-spec = DAGSpec('etl/pipeline.yaml')
-dag = spec.to_dag()
+# How often the navbar asks etl_jobs for the progress of a rebuild
+JOB_POLL_MS = 2000
 
 def get_icon(icon):
     return DashIconify(icon=icon, height=16)
 
 app = Dash(__name__, external_stylesheets=dmc.styles.ALL, use_pages=True)
 
+# Connection pool checkout waits and usage as JSON, for sizing database.POOL_SIZE / MAX_OVERFLOW
+@app.server.route("/pool-stats")
+def get_pool_stats():
+    return pool_stats.snapshot()
+
+# Query cache hit rate, entries and the data version they belong to
+@app.server.route("/cache-stats")
+def get_cache_stats():
+    return cache_stats()
+
 app.layout = dmc.MantineProvider(
     dmc.AppShell(
         [
             dmc.AppShellNavbar([
                 dmc.Title(f"Máté's movie and tv show reporting page", order=2, bd="xl", ta="center", mb="sm"),
                 dmc.Flex(
-                    [dmc.Flex(dmc.Button(
+                    [dmc.Flex([dmc.Button(
                         "Load data from database",
                         id="loading-button",
-                        leftSection=DashIconify(icon="fluent:database-plug-connected-20-filled"), w="100%"), mt="auto"),
+                        leftSection=DashIconify(icon="fluent:database-plug-connected-20-filled"), w="100%"),
+                        html.Div(id="etl-job-status"),
+                        dcc.Interval(id="etl-job-poll", interval=JOB_POLL_MS)],
+                        direction="column", gap="xs", mt="auto"),
                      dmc.Flex([dmc.NavLink(
                         label=(page["name"]),
                         leftSection=get_icon(icon="tabler:gauge"),
@@ -63,19 +78,44 @@ clientside_callback(
 )
 
 @callback(
-    Output("loading-button", "loading"),
+    Output("etl-job-poll", "disabled", allow_duplicate=True),
     Input("loading-button", "n_clicks"),
     prevent_initial_call=True,
 )
 def load_from_db(n_clicks):
+    # The rebuild runs in its own process, a click while one is running just follows that one
     if n_clicks > 0:
-        try:
-            dag.build(force=True)
-            return False
-        except Exception as e:
-            print(e)
-            return False
+        start_job()
     return False
+
+def render_job_status(status):
+    if status["state"] == "idle":
+        return None
+    tasks = status["tasks"]
+    label = {"running": "Loading", "succeeded": "Loaded", "failed": "Load failed"}[status["state"]]
+    children = [
+        dmc.Progress(value=100 * status["done"] / len(tasks) if tasks else 0,
+                     color="red" if status["state"] == "failed" else "blue"),
+        dmc.Text(f"{label} in {status['elapsed']:.0f}s, {status['done']}/{len(tasks)} tasks", size="sm"),
+    ]
+    for task in tasks:
+        duration = f" {task['duration']:.1f}s" if task["duration"] is not None else ""
+        children.append(dmc.Text(f"{task['name']}: {task['status']}{duration}", size="xs", c="dimmed"))
+    if status["error"]:
+        children.append(dmc.Text(status["error"], size="xs", c="red"))
+    return dmc.Stack(children, gap=4)
+
+@callback(
+    Output("loading-button", "loading"),
+    Output("etl-job-status", "children"),
+    Output("etl-job-poll", "disabled"),
+    Input("etl-job-poll", "n_intervals"),
+)
+def poll_etl_job(_):
+    # Polling stops once the rebuild is over, the first poll after a page load picks up a running one
+    status = job_status()
+    running = status["state"] == "running"
+    return running, render_job_status(status), not running
     
 if __name__ == "__main__":
     app.run(debug=True)
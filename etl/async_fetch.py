@@ -0,0 +1,225 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+
+from download_utils import CHUNK_SIZE, GzipFileWriter, extract_gzip_to_file, finish_download, write_json_bytes
+from manifest import MANIFEST_PATH, conditional_headers, get_entry, update_entry
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RANGE_PARTS = 4
+CONTENT_RANGE_PATTERN = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+DEFAULT_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=120)
+# Raw requests fetch .gz files byte for byte, we decompress them ourselves and ranges must index the stored bytes
+RAW_HEADERS = {"Accept-Encoding": "identity"}
+
+
+class AsyncFetcher:
+    """One pooled aiohttp session shared by every source, with per-host limits and retries."""
+
+    def __init__(self, limit=16, limit_per_host=4, timeout=DEFAULT_TIMEOUT, retries=4, backoff=1.0, headers=None):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.headers = headers
+        self.session = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host)
+        self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout, headers=self.headers)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+
+    def retry_delay(self, attempt):
+        return self.backoff * 2 ** attempt + random.uniform(0, self.backoff)
+
+    async def request(self, url, handle_response, headers=None, method="GET", raw=False):
+        """Send the request and pass the response to handle_response, retrying transient failures.
+
+        A raw request asks for the body without Content-Encoding and does not decode it.
+        """
+        if raw:
+            headers = {**(headers or {}), **RAW_HEADERS}
+        for attempt in range(self.retries + 1):
+            try:
+                async with self.session.request(method, url, headers=headers, auto_decompress=not raw) as response:
+                    if response.status >= 400:
+                        response.raise_for_status()
+                    return await handle_response(response)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if isinstance(e, aiohttp.ClientResponseError) and e.status not in RETRY_STATUSES:
+                    raise
+                if attempt == self.retries:
+                    raise
+                delay = self.retry_delay(attempt)
+                print(f"Request to {url} failed ({e!r}), retrying in {delay:.1f} s")
+                await asyncio.sleep(delay)
+
+async def write_gzip_stream(response, extracted_file):
+    writer = GzipFileWriter(extracted_file)
+    try:
+        async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+            writer.write(chunk)
+    finally:
+        stats = writer.close()
+    return stats
+
+async def write_json_stream(response, file_path):
+    return write_json_bytes(await response.read(), file_path)
+
+async def conditional_fetch(fetcher, url, file_path, write_stream, manifest_path=MANIFEST_PATH, raw=False):
+    """Async counterpart of download_utils.conditional_download, raw for write_gzip_stream."""
+    entry = get_entry(file_path, manifest_path) or {}
+    headers = conditional_headers(entry, url) if entry and os.path.exists(file_path) else None
+
+    async def handle_response(response):
+        if response.status == 304:
+            return None
+        stats = await write_stream(response, file_path + ".part")
+        return stats, response.headers.get("ETag"), response.headers.get("Last-Modified")
+
+    result = await fetcher.request(url, handle_response, headers=headers, raw=raw)
+    if result is None:
+        print(f"{url} not modified, keeping {file_path}")
+        update_entry(file_path, manifest_path, url=url, changed=False)
+        return False
+    stats, etag, last_modified = result
+    return finish_download(url, file_path, entry, stats, etag, last_modified, manifest_path)
+
+async def fetch_bytes(fetcher, url, headers=None):
+    async def read_body(response):
+        return await response.read()
+    return await fetcher.request(url, read_body, headers=headers)
+
+def split_ranges(size, parts):
+    """[start, end, received] triples covering size bytes, end inclusive as in a Range header."""
+    step = -(-size // parts)
+    return [[start, min(start + step, size) - 1, 0] for start in range(0, size, step)]
+
+def load_sidecar(sidecar_path):
+    if not os.path.exists(sidecar_path):
+        return None
+    with open(sidecar_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_sidecar(state, sidecar_path):
+    tmp_path = sidecar_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, sidecar_path)
+
+def verify_etag_md5(file_path, etag):
+    # S3/CloudFront ETags of single-part uploads are the MD5 of the object, use them when we can
+    etag = (etag or "").strip('"')
+    if not re.fullmatch(r"[0-9a-f]{32}", etag):
+        return
+    md5 = hashlib.md5()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            md5.update(chunk)
+    if md5.hexdigest() != etag:
+        raise ValueError(f"{file_path} does not match the ETag MD5 {etag}")
+
+async def probe(fetcher, url):
+    async def read_headers(response):
+        return response.headers
+    return await fetcher.request(url, read_headers, method="HEAD", raw=True)
+
+async def fetch_range(fetcher, url, compressed_path, byte_range, validator, save_progress):
+    start, end, _ = byte_range
+
+    async def write_range(response):
+        if response.status != 206:
+            raise ValueError(f"{url} answered {response.status} to a range request, it changed upstream")
+        # Seek to whatever the server actually sent, a retried request may resume further along
+        match = CONTENT_RANGE_PATTERN.fullmatch(response.headers.get("Content-Range", ""))
+        if not match or int(match.group(2)) != end:
+            raise ValueError(f"Unexpected Content-Range {response.headers.get('Content-Range')!r} from {url}")
+        offset = int(match.group(1))
+        byte_range[2] = offset - start
+        with open(compressed_path, "r+b") as f:
+            f.seek(offset)
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                if byte_range[2] + len(chunk) > end - start + 1:
+                    raise ValueError(f"{url} sent more bytes than requested for range {start}-{end}")
+                f.write(chunk)
+                f.flush()
+                byte_range[2] += len(chunk)
+                save_progress()
+
+    while start + byte_range[2] <= end:
+        headers = {"Range": f"bytes={start + byte_range[2]}-{end}"}
+        if validator:
+            headers["If-Range"] = validator
+        await fetcher.request(url, write_range, headers=headers, raw=True)
+
+async def ranged_gzip_fetch(fetcher, url, file_path, parts=RANGE_PARTS, manifest_path=MANIFEST_PATH):
+    """Fetch a large .gz in parallel byte ranges, resuming from the .gz.part sidecar of an earlier run.
+
+    Falls back to conditional_fetch when the server does not advertise range support.
+    """
+    headers = await probe(fetcher, url)
+    size = int(headers.get("Content-Length", 0))
+    etag = headers.get("ETag")
+    last_modified = headers.get("Last-Modified")
+    if headers.get("Accept-Ranges", "").lower() != "bytes" or size == 0:
+        print(f"{url} does not support range requests, downloading it in one piece")
+        return await conditional_fetch(fetcher, url, file_path, write_gzip_stream, manifest_path, raw=True)
+
+    entry = get_entry(file_path, manifest_path) or {}
+    if os.path.exists(file_path) and entry.get("size") == size and (
+            (etag and entry.get("etag") == etag) or (not etag and last_modified and entry.get("last_modified") == last_modified)):
+        print(f"{url} not modified, keeping {file_path}")
+        update_entry(file_path, manifest_path, url=url, changed=False)
+        return False
+
+    compressed_path = file_path + ".gz.part"
+    sidecar_path = compressed_path + ".json"
+    state = load_sidecar(sidecar_path)
+    if not (state and os.path.exists(compressed_path) and state["url"] == url and state["size"] == size
+            and state["etag"] == etag and state["last_modified"] == last_modified):
+        state = {"url": url, "size": size, "etag": etag, "last_modified": last_modified,
+                 "ranges": split_ranges(size, parts)}
+        with open(compressed_path, "wb") as f:
+            f.truncate(size)
+        save_sidecar(state, sidecar_path)
+    else:
+        received = sum(byte_range[2] for byte_range in state["ranges"])
+        print(f"Resuming {url} from {received} of {size} bytes")
+
+    await asyncio.gather(*(
+        fetch_range(fetcher, url, compressed_path, byte_range, etag or last_modified,
+                    lambda: save_sidecar(state, sidecar_path))
+        for byte_range in state["ranges"]
+    ))
+
+    received = sum(byte_range[2] for byte_range in state["ranges"])
+    if received != size or os.path.getsize(compressed_path) != size:
+        raise ValueError(f"Stitched {received} bytes of {url} into {compressed_path}, expected {size}")
+
+    def verify_and_extract():
+        verify_etag_md5(compressed_path, etag)
+        return extract_gzip_to_file(compressed_path, file_path + ".part")
+
+    stats = await asyncio.to_thread(verify_and_extract)
+    os.remove(compressed_path)
+    os.remove(sidecar_path)
+    return finish_download(url, file_path, entry, stats, etag, last_modified, manifest_path)
+
+def run_coroutine(coroutine):
+    # Ploomber runs the scripts inside a Jupyter kernel that already has a running event loop
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
@@ -0,0 +1,55 @@
+"""Scaling report of clean_imdb_titles_parallel for 1, 2, 4 and 8 workers.
+
+Every run is checked against the serial chunked output before its time is reported.
+
+Usage: python bench_clean_imdb_titles.py [imdb_titles.tsv imdb_ratings.tsv] [--workers 1,2,4,8]
+       (defaults to the dumps in etl/datasets)
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from clean_imdb_titles import clean_imdb_titles_chunked, clean_imdb_titles_parallel
+from intermediates import read_table
+
+DATASETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "datasets")
+TITLES_FILE = os.path.join(DATASETS_DIR, "imdb_titles.tsv")
+RATINGS_FILE = os.path.join(DATASETS_DIR, "imdb_ratings.tsv")
+WORKER_COUNTS = [1, 2, 4, 8]
+
+
+def timed(function, *args, **kwargs):
+    start_time = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start_time
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("titles_file", nargs="?", default=TITLES_FILE)
+    parser.add_argument("ratings_file", nargs="?", default=RATINGS_FILE)
+    parser.add_argument("--workers", default=",".join(map(str, WORKER_COUNTS)))
+    args = parser.parse_args()
+    worker_counts = [int(workers) for workers in args.workers.split(",")]
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        serial_output = os.path.join(output_dir, "serial.parquet")
+        serial_seconds = timed(clean_imdb_titles_chunked, args.titles_file, args.ratings_file, serial_output)
+        expected = read_table(serial_output).astype({"titleType": str})
+
+        report = []
+        for workers in worker_counts:
+            output = os.path.join(output_dir, f"parallel_{workers}.parquet")
+            seconds = timed(clean_imdb_titles_parallel, args.titles_file, args.ratings_file, output, workers=workers)
+            assert read_table(output).astype({"titleType": str}).equals(expected), f"{workers} workers differ"
+            report.append((workers, seconds))
+
+    print(f"\n{os.cpu_count()} CPUs, serial chunked: {serial_seconds:.2f} s")
+    print(f"{'workers':>7} {'seconds':>8} {'speedup':>8} {'efficiency':>10}")
+    baseline = report[0][1]
+    for workers, seconds in report:
+        speedup = baseline / seconds
+        print(f"{workers:>7} {seconds:>8.2f} {speedup:>7.2f}x {speedup / workers:>10.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Seconds of the old pd.read_json + per-row lambda cleaning against clean_netflix_titles.clean_titles.
+
+Usage: python bench_clean_netflix_titles.py [netflix_originals.json netflix_cancelled_shows.csv]
+       (defaults to the files in etl/datasets)
+"""
+import os
+import sys
+import time
+
+import pandas as pd
+
+from clean_netflix_titles import COLUMNS_TO_KEEP, clean_titles, load_cancelled_titles, load_netflix_titles
+from genres import normalize_genres
+from title_keys import normalize_titles
+
+DATASETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "datasets")
+ORIGINALS_FILE = os.path.join(DATASETS_DIR, "netflix_originals.json")
+CANCELLED_SHOWS_FILE = os.path.join(DATASETS_DIR, "netflix_cancelled_shows.csv")
+COMPARED_COLUMNS = ['title', 'type', 'titlereleased', 'title_cleaned', 'category', 'cancelled']
+
+
+def clean_per_row(originals_file, cancelled_shows_file):
+    # The module level code clean_netflix_titles.py used to run on import
+    cancelled_shows = pd.read_csv(cancelled_shows_file)
+    cancelled_titles_set = set(normalize_titles(cancelled_shows['Title']))
+    df = pd.read_json(originals_file)[COLUMNS_TO_KEEP]
+    df = df[~df['titlereleased'].str.contains("Limited Series", na=False)]
+    df['title'] = df['title'].apply(lambda x: x.rstrip() if isinstance(x, str) else x)
+    df['title_cleaned'] = normalize_titles(df['title'])
+    df['date_released'] = df['date_released'].apply(lambda x: x[:4] if isinstance(x, str) else x)
+    df['titlereleased'] = df.apply(
+        lambda row: row['date_released'] if isinstance(row['titlereleased'], str) and row['titlereleased'].strip() == "" else row['titlereleased'],
+        axis=1
+    )
+    df['titlereleased'] = df['titlereleased'].apply(lambda x: x[:4] if isinstance(x, str) else x)
+    df['category'] = normalize_genres(df['category'])
+    df['cancelled'] = df['title_cleaned'].apply(lambda x: x in cancelled_titles_set)
+    df['type'] = df['type'].apply(lambda x: 'movie' if x == "Movie" else 'tvSeries' if x == "TV" else x)
+    return df
+
+def vectorized(originals_file, cancelled_shows_file):
+    return clean_titles(load_netflix_titles(originals_file), load_cancelled_titles(cancelled_shows_file))
+
+def timed(function, *args):
+    start_time = time.perf_counter()
+    result = function(*args)
+    print(f"{function.__name__}: {time.perf_counter() - start_time:.3f} s, {len(result):,} titles")
+    return result
+
+def main(originals_file, cancelled_shows_file):
+    old = timed(clean_per_row, originals_file, cancelled_shows_file)
+    new = timed(vectorized, originals_file, cancelled_shows_file)
+    pd.testing.assert_frame_equal(old[COMPARED_COLUMNS].reset_index(drop=True),
+                                  new[COMPARED_COLUMNS].reset_index(drop=True))
+
+if __name__ == "__main__":
+    main(*(sys.argv[1:3] if len(sys.argv) > 2 else (ORIGINALS_FILE, CANCELLED_SHOWS_FILE)))
@@ -0,0 +1,21 @@
+"""Rows/sec of the ORM and the COPY load engines, each one reloads the whole database.
+
+Run from the repository root against a development database: python etl/bench_load_database.py [orm,copy]
+"""
+import sys
+import time
+
+from load_database import LOADERS, load_data
+
+
+def main(load_engines):
+    seconds = {}
+    for load_engine in load_engines:
+        start_time = time.time()
+        load_data(load_engine, load_mode="full")
+        seconds[load_engine] = time.time() - start_time
+    for load_engine, load_seconds in seconds.items():
+        print(f"{load_engine}: {load_seconds:.2f} seconds in total")
+
+if __name__ == "__main__":
+    main(sys.argv[1].split(",") if len(sys.argv) > 1 else list(LOADERS))
@@ -0,0 +1,57 @@
+"""Netflix<->IMDb matching: the old per-row boolean scan against load_database.match_netflix.
+
+Reads the cleaned products load_database reads (run from the repository root). The per-row scan is
+timed on the first --old-rows titles and extrapolated to the full set, it takes hours otherwise.
+
+Usage: python etl/bench_netflix_matching.py [--old-rows 20000]
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from load_database import build_netflix_index, match_netflix, read_imdb_titles, read_netflix_originals
+
+OLD_ROWS = 20000
+MATCH_COLUMNS = ['primaryTitle_cleaned', 'startYear', 'titleType']
+
+
+def per_row_scan(chunk, netflix_originals):
+    # What load_imdb_data used to run for every IMDb row
+    years = pd.to_numeric(netflix_originals['titlereleased'], errors='coerce')
+    netflix_ids = []
+    for _, row in chunk.iterrows():
+        matching_netflix = netflix_originals[(netflix_originals['title_cleaned'] == row['primaryTitle_cleaned']) &
+                                             (years == row['startYear']) &
+                                             (netflix_originals['type'] == row['titleType'])]
+        netflix_ids.append(int(matching_netflix.iloc[0]['netflixid']) if not matching_netflix.empty else None)
+    return netflix_ids
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--old-rows", type=int, default=OLD_ROWS)
+    args = parser.parse_args()
+
+    netflix_originals = read_netflix_originals()
+    imdb_titles = pd.concat(read_imdb_titles(columns=MATCH_COLUMNS), ignore_index=True)
+    print(f"{len(imdb_titles):,} IMDb titles, {len(netflix_originals):,} Netflix titles")
+
+    start_time = time.perf_counter()
+    netflix_index = build_netflix_index(netflix_originals)
+    netflix_ids, _ = match_netflix(imdb_titles, netflix_index)
+    new_seconds = time.perf_counter() - start_time
+    print(f"hash join: {new_seconds:.2f} s for all titles, {netflix_ids.notna().sum():,} matched")
+
+    sample = imdb_titles.head(args.old_rows)
+    start_time = time.perf_counter()
+    old_ids = per_row_scan(sample, netflix_originals)
+    old_seconds = time.perf_counter() - start_time
+    estimate = old_seconds * len(imdb_titles) / max(len(sample), 1)
+    print(f"per-row scan: {old_seconds:.2f} s for {len(sample):,} titles, ~{estimate:,.0f} s for all titles "
+          f"({estimate / new_seconds:,.0f}x slower)")
+
+    new_ids = [None if pd.isna(netflix_id) else netflix_id for netflix_id in netflix_ids.head(len(sample))]
+    assert new_ids == old_ids
+
+if __name__ == "__main__":
+    main()
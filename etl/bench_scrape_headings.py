@@ -0,0 +1,54 @@
+"""Compare the full html.parser tree with the strained heading parse on saved HTML pages.
+
+Usage: python bench_scrape_headings.py [page.html ...]   (defaults to fixtures/*.html)
+       python bench_scrape_headings.py --save             (saves the live list page into fixtures/)
+"""
+import glob
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+from scrape_headings import HEADERS, URL, fetch_page, parse_headings
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+REPEAT = 20
+
+
+def parse_headings_full_tree(html_content):
+    soup = BeautifulSoup(html_content, "html.parser")
+    headings = soup.find_all(class_="article-list__heading")
+    return [heading.get_text(strip=True).strip("'") for heading in headings]
+
+def time_parser(parser, html_content, repeat=REPEAT):
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        result = parser(html_content)
+    return (time.perf_counter() - start_time) / repeat, result
+
+def bench(paths):
+    for path in paths:
+        with open(path, "rb") as f:
+            html_content = f.read()
+        full_seconds, full_result = time_parser(parse_headings_full_tree, html_content)
+        strained_seconds, strained_result = time_parser(parse_headings, html_content)
+        assert full_result == strained_result, f"{path}: strained parse disagrees with the full tree"
+        print(
+            f"{os.path.basename(path)}: {len(html_content) / 1024:.0f} KiB, {len(full_result)} headings, "
+            f"full tree {full_seconds * 1000:.1f} ms, strained {strained_seconds * 1000:.1f} ms, "
+            f"{full_seconds / strained_seconds:.1f}x"
+        )
+
+def save_live_page():
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    path = os.path.join(FIXTURES_DIR, "decider_canceled_shows_live.html")
+    with open(path, "wb") as f:
+        f.write(fetch_page(URL, HEADERS))
+    print(f"Saved {URL} to {path}")
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--save"]:
+        save_live_page()
+    else:
+        bench(sys.argv[1:] or sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html"))))
@@ -0,0 +1,50 @@
+"""Rows/sec of per-row title key normalization against title_keys.normalize_titles.
+
+Usage: python bench_title_keys.py [imdb_titles.tsv]   (defaults to etl/datasets/imdb_titles.tsv)
+"""
+import os
+import re
+import sys
+import time
+import unicodedata
+
+import pandas as pd
+
+from title_keys import normalize_titles
+
+TITLES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "datasets", "imdb_titles.tsv")
+
+
+def normalize_and_clean_title_per_row(title):
+    # The implementation the cleaning stages used to run through Series.apply
+    if not isinstance(title, str):
+        return ""
+    title = unicodedata.normalize('NFD', title).encode('ascii', 'ignore').decode('ascii')
+    title = title.lower()
+    title = re.sub(r'[^\w]', '', title)
+    title = title.strip()
+    title = title.replace("theseries", "").replace("themovie", "")
+    return title
+
+def timed(function, titles):
+    start_time = time.perf_counter()
+    result = function(titles)
+    seconds = time.perf_counter() - start_time
+    print(f"{function.__name__}: {seconds:.2f} s, {len(titles) / seconds:,.0f} rows/sec")
+    return result
+
+def per_row(titles):
+    return titles.apply(normalize_and_clean_title_per_row)
+
+def vectorized(titles):
+    return normalize_titles(titles)
+
+def main(titles_file):
+    titles = pd.read_csv(titles_file, sep='\t', usecols=['primaryTitle'], dtype=str)['primaryTitle']
+    print(f"{len(titles):,} rows, {titles.nunique():,} distinct titles")
+    old = timed(per_row, titles)
+    new = timed(vectorized, titles)
+    assert old.equals(new)
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else TITLES_FILE)
@@ -1,109 +1,214 @@
 # + tags=["parameters"]
 # declare a list tasks whose products you want to use as inputs
-upstream = ["gather_netflix_titles"]
+upstream = ["gather_all"]
 
 # -
 
+import io
+import json
 import os
-import re
-import unicodedata
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 
+from genres import genre_names, normalize_genres
+from title_keys import normalize_titles
+from manifest import product_unchanged
+from intermediates import COLUMNAR, IMDB_TITLES_SCHEMA, TableWriter, cleaned_path, write_table
+
 FILE_PATH = 'etl/datasets/imdb_titles.tsv'
 RATINGS_FILE = 'etl/datasets/imdb_ratings.tsv'
-CLEANED_FILE_PATH = 'etl/datasets/imdb_titles_cleaned.csv'
+CLEANED_FILE_PATH = cleaned_path('imdb_titles_cleaned', 'csv')
 
-def normalize_genre(genre):
-    genres_parsed = [g.strip() for g in genre.split(",")] if genre else []
-    
-    genre_mapping = {
-        'Drama': ['Drama', 'Dramas'],
-        'Comedy': ['Comedy', 'Stand-up Comedy', 'Stand-up', 'Standup'],
-        'Action': ['Action'],
-        'Romance': ['Romance', 'Romantic'],
-        'Sci-Fi/Fantasy': ['Sci-Fi', 'Sci-fi', 'Fantasy'],
-        'Thriller': ['Thriller', 'Thrillers'],
-        'Horror': ['Horror'],
-        'Mystery': ['Mystery'],
-        'Crime': ['Crime', 'True Crime', 'True-crime', 'Con-Artist'],
-        'Documentary': ['Documentary', 'Docuseries', 'Docudrama', 'Behind the Scenes', 'Making-of', 'Making-Of'],
-        'Biographical': ['Biography'],
-        'Historical': ['History', 'Historical'],
-        'Family/Children': ['Family', 'Kids', 'Children'],
-        'Animation': ['Animation', 'Animated', 'Cartoon', 'Anime'],
-        'Adventure': ['Adventure'],
-        'Teen': ['Teen'],
-        'Medical': ['Medical'],
-        'LGBTQ': ['LGBTQ'],
-        'Stand-up Comedy': ['Stand-up', 'Standup', 'Stand-up Special'],
-        'Sports': ['Sport', 'Boxing', 'Sports'],
-        'Reality TV': ['Reality-TV', 'Reality TV', 'Reality'],
-        'Game Show': ['Game-Show'],
-        'Talk Show': ['Talk Show', 'Talk Shows'],
-        'Variety': ['Variety'],
-        'Political': ['Political'],
-        'Music': ['Music'],
-        'Specials': ['Special', 'Making-of', 'Behind-the-scenes'],
-        'Regional': ['Bollywood', 'Nollywood', 'Spanish', 'French', 'Latin American TV'],
-        'Food/Travel': ['Food', 'Travel'],
-        'Courtroom': ['Courtroom'],
-        'Movies/TV': ['Movies', 'TV'],
-        'Stories/BLM': ['Stories', 'BLM'],
-        'Zombie': ['Zombie'],
-        'Korean': ['Korean', 'K-Drama'],
-    }
-    
-    if not genres_parsed:
-        return 'Other'
-    
-    categories_of_genre = set()
-    
-    for category, keywords in genre_mapping.items():
-        for g in genres_parsed:
-            if g in keywords:
-                categories_of_genre.add(category)
-    
-    return ",".join(categories_of_genre) if categories_of_genre else "Other"
-
-def normalize_and_clean_title(title):
-    if not isinstance(title, str):
-        return ""
-    title = unicodedata.normalize('NFD', title).encode('ascii', 'ignore').decode('ascii')
-    title = title.lower()
-    title = re.sub(r'[^\w]', '', title)
-    title = title.strip()
-    title = title.replace("theseries", "").replace("themovie", "")
-    return title
+UNWANTED_TYPES = ['short', 'videoGame', 'tvEpisode', 'tvMiniSeries', 'tvSpecial', 'tvShort', 'tvMovie', 'video']
+EXCLUDED_GENRES = ["Talk-Show", "Short", "News", "Sport"]
+DROPPED_COLUMNS = ['originalTitle', 'isAdult', 'endYear']
 
-def clean_imdb_titles(file_path, ratings_file, cleaned_file_path):
-    df = pd.read_csv(file_path, sep='\t')
+# Streaming mode: read only the columns we keep, typed, and clean + write chunk by chunk
+CHUNKED = True
+CHUNK_SIZE = 200_000
+TITLE_COLUMNS = ['tconst', 'titleType', 'primaryTitle', 'startYear', 'runtimeMinutes', 'genres']
+TITLE_DTYPES = {
+    'tconst': str,
+    'titleType': 'category',
+    'primaryTitle': str,
+    'startYear': str,
+    # Stays a string so "\\N" runtimes reach load_database exactly as in the full read
+    'runtimeMinutes': str,
+    'genres': str,
+}
+TITLE_READ_OPTIONS = {
+    'sep': '\t',
+    'usecols': TITLE_COLUMNS,
+    'dtype': TITLE_DTYPES,
+    'na_values': {'startYear': ['\\N']},
+}
 
+# Parallel mode: more than one worker cleans row-range partitions of the dump in a process pool.
+# Partitions are capped in size so memory stays bounded and the workers stay busy until the end.
+WORKERS = 1
+PARTITION_BYTES = 32 * 1024 * 1024
+
+def load_ratings(ratings_file):
+    return pd.read_csv(ratings_file, sep='\t', usecols=['tconst', 'averageRating'], dtype=str)
+
+def filter_titles(df):
     # Remove unwanted types
-    unwanted_types = ['short', 'videoGame', 'tvEpisode', 'tvMiniSeries', 'tvSpecial', 'tvShort', 'tvMovie', 'video']
-    df = df[~df['titleType'].isin(unwanted_types)]
+    df = df[~df['titleType'].isin(UNWANTED_TYPES)]
 
     # Exclude unwanted genres
-    excluded_genres = ["Talk-Show", "Short", "News", "Sport"]
-    df = df[~df['genres'].str.contains("|".join(excluded_genres), na=False, case=False)]
-    df['genres'] = df['genres'].apply(normalize_genre)
+    df = df[~df['genres'].str.contains("|".join(EXCLUDED_GENRES), na=False, case=False)]
 
-    # Remove columns and rows with startYear < 1980 and normalize title
+    # Remove columns and rows with startYear < 1980 and normalize genres and title
     df = df[pd.to_numeric(df['startYear'], errors='coerce') >= 1980]
-    df = df.drop(columns=['originalTitle', 'isAdult', 'endYear'])
-    df['primaryTitle_cleaned'] = df['primaryTitle'].apply(normalize_and_clean_title)
+    df = df.drop(columns=[column for column in DROPPED_COLUMNS if column in df.columns])
+    df['genres'] = normalize_genres(df['genres'])
+    df['primaryTitle_cleaned'] = normalize_titles(df['primaryTitle'])
+    return df
 
-    ratings_df = pd.read_csv(ratings_file, sep='\t', dtype=str)
-    ratings_df = ratings_df.drop(columns=['numVotes'])
-
-    # Merge with ratings data
+def merge_ratings(df, ratings_df):
+    # A left merge keeps the title order, so merging chunk by chunk gives the same rows as one merge
     imdb_data = pd.merge(df, ratings_df, on="tconst", how="left")
-    imdb_data = imdb_data.dropna()
+    return imdb_data.dropna()
+
+def clean_titles(df, ratings_df):
+    return merge_ratings(filter_titles(df), ratings_df)
+
+def type_titles(df):
+    df['startYear'] = pd.to_numeric(df['startYear'], errors='coerce').astype('Int16')
+    return df
+
+def read_titles_chunked(file_path, chunksize=CHUNK_SIZE):
+    for chunk in pd.read_csv(file_path, chunksize=chunksize, **TITLE_READ_OPTIONS):
+        yield type_titles(chunk)
+
+def line_partitions(file_path, partition_bytes=PARTITION_BYTES):
+    """Header line and (start, end) byte ranges of the rows, every range starts at the beginning of a line.
+
+    The dump has no quoted line breaks, so a line is always one title.
+    """
+    with open(file_path, 'rb') as f:
+        header = f.readline()
+        start = f.tell()
+        size = os.fstat(f.fileno()).st_size
+        ranges = []
+        while start < size:
+            f.seek(min(start + partition_bytes, size) - 1)
+            f.readline()
+            end = min(f.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return header, ranges
+
+def read_partition(file_path, header, start, end):
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        rows = f.read(end - start)
+    return type_titles(pd.read_csv(io.BytesIO(header + rows), **TITLE_READ_OPTIONS))
+
+def filter_partition(file_path, header, start, end):
+    """Runs in a worker process: read one row range and clean it, the ratings are merged by the parent."""
+    titles = read_partition(file_path, header, start, end)
+    return len(titles), filter_titles(titles)
+
+class CsvChunkWriter:
+    """Writes the header with the first chunk and appends the rest, same interface as TableWriter."""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.first_chunk = True
+
+    def write(self, df):
+        df.to_csv(self.file_path, sep=",", index=False, mode='w' if self.first_chunk else 'a', header=self.first_chunk)
+        self.first_chunk = False
+
+    def close(self, metadata=None):
+        pass
+
+def genres_metadata(names):
+    # Stored with the cleaned titles, load_database creates every category from it without reading the genres
+    return {"genres": json.dumps(sorted(names))}
+
+def open_cleaned_writer(cleaned_file_path):
+    # Every chunk becomes one row group of the Parquet file
+    return TableWriter(cleaned_file_path, IMDB_TITLES_SCHEMA) if COLUMNAR else CsvChunkWriter(cleaned_file_path)
+
+def clean_imdb_titles(file_path, ratings_file, cleaned_file_path):
+    df = pd.read_csv(file_path, sep='\t')
+    imdb_data = clean_titles(df, load_ratings(ratings_file))
+    if COLUMNAR:
+        metadata = genres_metadata(genre_names(imdb_data['genres']))
+        write_table(imdb_data, IMDB_TITLES_SCHEMA, cleaned_file_path, metadata)
+        return
     imdb_data.to_csv(cleaned_file_path, sep=",", index=False)
     
     print(f"Cleaned data saved to {cleaned_file_path}")
 
+def clean_imdb_titles_chunked(file_path, ratings_file, cleaned_file_path, chunksize=CHUNK_SIZE):
+    ratings_df = load_ratings(ratings_file)
+    rows_read = 0
+    rows_written = 0
+    genres = set()
+    writer = open_cleaned_writer(cleaned_file_path)
+    for chunk in read_titles_chunked(file_path, chunksize):
+        rows_read += len(chunk)
+        imdb_data = clean_titles(chunk, ratings_df)
+        rows_written += len(imdb_data)
+        genres |= genre_names(imdb_data['genres'])
+        writer.write(imdb_data)
+    writer.close(genres_metadata(genres))
+
+    print(f"Cleaned data saved to {cleaned_file_path} ({rows_written} of {rows_read} titles kept)")
+
+def ordered_results(executor, function, arguments, window):
+    """Yield function(*args) for each of arguments in order, with at most window calls submitted and not yet yielded.
+
+    Unlike executor.map, which submits everything up front, finished results never pile up beyond the window.
+    """
+    pending = deque()
+    for args in arguments:
+        if len(pending) == window:
+            yield pending.popleft().result()
+        pending.append(executor.submit(function, *args))
+    while pending:
+        yield pending.popleft().result()
+
+def clean_imdb_titles_parallel(file_path, ratings_file, cleaned_file_path, workers=WORKERS,
+                               partition_bytes=PARTITION_BYTES):
+    # At least one partition per worker, also for dumps smaller than workers * partition_bytes
+    partition_bytes = max(1, min(partition_bytes, -(-os.path.getsize(file_path) // workers)))
+    header, ranges = line_partitions(file_path, partition_bytes)
+    ratings_df = load_ratings(ratings_file)
+    rows_read = 0
+    rows_written = 0
+    genres = set()
+    writer = open_cleaned_writer(cleaned_file_path)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # One partition per worker in flight, yielded in file order so the output is the same as the serial one
+        partitions = ordered_results(executor, filter_partition,
+                                     ((file_path, header, start, end) for start, end in ranges), workers)
+        for partition_rows, titles in partitions:
+            rows_read += partition_rows
+            imdb_data = merge_ratings(titles, ratings_df)
+            rows_written += len(imdb_data)
+            genres |= genre_names(imdb_data['genres'])
+            writer.write(imdb_data)
+    writer.close(genres_metadata(genres))
+
+    print(f"Cleaned data saved to {cleaned_file_path} ({rows_written} of {rows_read} titles kept, "
+          f"{len(ranges)} partitions on {workers} workers)")
+
 def main():
-    clean_imdb_titles(FILE_PATH, RATINGS_FILE, CLEANED_FILE_PATH)
+    if product_unchanged(FILE_PATH) and product_unchanged(RATINGS_FILE) and os.path.exists(CLEANED_FILE_PATH):
+        print(f"IMDb dumps unchanged since the last run, keeping {CLEANED_FILE_PATH}")
+        return
+    if WORKERS > 1:
+        clean_imdb_titles_parallel(FILE_PATH, RATINGS_FILE, CLEANED_FILE_PATH)
+    elif CHUNKED:
+        clean_imdb_titles_chunked(FILE_PATH, RATINGS_FILE, CLEANED_FILE_PATH)
+    else:
+        clean_imdb_titles(FILE_PATH, RATINGS_FILE, CLEANED_FILE_PATH)
 
 if __name__ == "__main__":
     main()
@@ -1,6 +1,6 @@
 # + tags=["parameters"]
 # declare a list tasks whose products you want to use as inputs
-upstream = ["gather_netflix_stock_data"]
+upstream = ["gather_all"]
 
 # -
 
@@ -8,32 +8,67 @@ import json
 import os
 import pandas as pd
 
+from json_stream import iter_json_path
+from manifest import product_unchanged
+from intermediates import COLUMNAR, STOCK_PRICES_SCHEMA, cleaned_path, write_table
+
 FILE_TO_CLEAN_PATH = 'etl/datasets/netflix_stock_data.json'
-CLEANED_FILE_PATH = 'etl/datasets/netflix_stock_data_cleaned.json'
+CLEANED_FILE_PATH = cleaned_path('netflix_stock_data_cleaned', 'json')
+# Where the bars sit in the CNBC getQuoteChartData response
+PRICE_BARS_PATH = ('data', 'chartData', 'priceBars')
+# Scalar fields of the response, stored in the Parquet schema metadata next to the price bars
+METADATA_FIELDS = ['timeRange', 'symbol', 'name']
+PRICE_BAR_FIELDS = ['open', 'high', 'low', 'close', 'volume', 'tradeTime', 'tradeTimeinMills']
+FLOAT_FIELDS = ['open', 'high', 'low', 'close']
 
 def load_stock_data(file_path):
-    return pd.read_json(file_path)
-
-def clean_stock_data(df):
-    df_cleaned = df.apply(lambda x: {
-        "timeRange": x[0].get('timeRange', None),
-        "symbol": x[0].get('symbol', None),
-        "name": x[0].get('allSymbols', [{}])[0].get('name', None) if x[0].get('allSymbols') else None,
-        "priceBars": x[0].get('priceBars', None)
-    }).iloc[0]
-    return df_cleaned
-
-def save_cleaned_data(data, file_path):
+    """Stream the price bars into one list per field, returns the response metadata and the bars."""
+    chart_data = {}
+    columns = {field: [] for field in PRICE_BAR_FIELDS}
+    for price_bar in iter_json_path(file_path, PRICE_BARS_PATH, chart_data):
+        for field, column in columns.items():
+            column.append(price_bar.get(field))
+
+    all_symbols = chart_data.get('allSymbols')
+    metadata = {
+        "timeRange": chart_data.get('timeRange'),
+        "symbol": chart_data.get('symbol'),
+        "name": all_symbols[0].get('name') if all_symbols else None,
+    }
+    return metadata, pd.DataFrame(columns)
+
+def clean_stock_data(price_bars):
+    # CNBC sends the numbers as strings, anything that does not parse becomes null in its own column
+    for field in FLOAT_FIELDS:
+        price_bars[field] = pd.to_numeric(price_bars[field], errors='coerce').astype('Float64')
+    for field in ['volume', 'tradeTimeinMills']:
+        price_bars[field] = pd.to_numeric(price_bars[field], errors='coerce').astype('Int64')
+    price_bars['tradeTime'] = price_bars['tradeTime'].astype('string')
+    price_bars['tradeTimestamp'] = pd.to_datetime(price_bars['tradeTimeinMills'], unit='ms', utc=True)
+    return price_bars
+
+def save_cleaned_data(metadata, price_bars, file_path):
+    price_bars = price_bars[PRICE_BAR_FIELDS].astype(object).where(price_bars[PRICE_BAR_FIELDS].notna(), None)
     with open(file_path, 'w') as f:
-        json.dump(data, f, indent=4)
+        json.dump({**metadata, "priceBars": price_bars.to_dict('records')}, f, indent=4)
     print(f"Cleaned data saved to {file_path}")
 
+def save_cleaned_table(metadata, price_bars, file_path):
+    metadata = {field: metadata[field] or "" for field in METADATA_FIELDS}
+    write_table(price_bars, STOCK_PRICES_SCHEMA, file_path, metadata=metadata)
+
 def main():
-    df = load_stock_data(FILE_TO_CLEAN_PATH)
-    cleaned_data = clean_stock_data(df)
-    save_cleaned_data(cleaned_data, CLEANED_FILE_PATH)
+    if product_unchanged(FILE_TO_CLEAN_PATH) and os.path.exists(CLEANED_FILE_PATH):
+        print(f"Stock data unchanged since the last run, keeping {CLEANED_FILE_PATH}")
+        return
+    metadata, price_bars = load_stock_data(FILE_TO_CLEAN_PATH)
+    price_bars = clean_stock_data(price_bars)
+    if COLUMNAR:
+        save_cleaned_table(metadata, price_bars, CLEANED_FILE_PATH)
+    else:
+        save_cleaned_data(metadata, price_bars, CLEANED_FILE_PATH)
 
 if __name__ == "__main__":
     main()
 
-#os.remove(FILE_TO_CLEAN_PATH)
\ No newline at end of file
+#os.remove(FILE_TO_CLEAN_PATH)
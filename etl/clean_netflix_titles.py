@@ -1,111 +1,72 @@
 # + tags=["parameters"]
 # declare a list tasks whose products you want to use as inputs
-upstream = ["gather_netflix_titles", "scrape_headings"]
+upstream = ["gather_all"]
 
 # -
 
 import os
-import re
-import unicodedata
 import pandas as pd
 
-def normalize_genre(genre):
-    genres_parsed = [g.strip() for g in genre.split(",")] if genre else []
-    
-    genre_mapping = {
-        'Drama': ['Drama', 'Dramas'],
-        'Comedy': ['Comedy', 'Stand-up Comedy', 'Stand-up', 'Standup'],
-        'Action': ['Action'],
-        'Romance': ['Romance', 'Romantic'],
-        'Sci-Fi/Fantasy': ['Sci-Fi', 'Sci-fi', 'Fantasy'],
-        'Thriller': ['Thriller', 'Thrillers'],
-        'Horror': ['Horror'],
-        'Mystery': ['Mystery'],
-        'Crime': ['Crime', 'True Crime', 'True-crime', 'Con-Artist'],
-        'Documentary': ['Documentary', 'Docuseries', 'Docudrama', 'Behind the Scenes', 'Making-of', 'Making-Of'],
-        'Biographical': ['Biography'],
-        'Historical': ['History', 'Historical'],
-        'Family/Children': ['Family', 'Kids', 'Children'],
-        'Animation': ['Animation', 'Animated', 'Cartoon', 'Anime'],
-        'Adventure': ['Adventure'],
-        'Teen': ['Teen'],
-        'Medical': ['Medical'],
-        'LGBTQ': ['LGBTQ'],
-        'Stand-up Comedy': ['Stand-up', 'Standup', 'Stand-up Special'],
-        'Sports': ['Sport', 'Boxing', 'Sports'],
-        'Reality TV': ['Reality-TV', 'Reality TV', 'Reality'],
-        'Game Show': ['Game-Show'],
-        'Talk Show': ['Talk Show', 'Talk Shows'],
-        'Variety': ['Variety'],
-        'Political': ['Political'],
-        'Music': ['Music'],
-        'Specials': ['Special', 'Making-of', 'Behind-the-scenes'],
-        'Regional': ['Bollywood', 'Nollywood', 'Spanish', 'French', 'Latin American TV'],
-        'Food/Travel': ['Food', 'Travel'],
-        'Courtroom': ['Courtroom'],
-        'Movies/TV': ['Movies', 'TV'],
-        'Stories/BLM': ['Stories', 'BLM'],
-        'Zombie': ['Zombie'],
-        'Korean': ['Korean', 'K-Drama'],
-    }
-    
-    if not genres_parsed:
-        return 'Other'
-    
-    categories_of_genre = set()
-    
-    for category, keywords in genre_mapping.items():
-        for g in genres_parsed:
-            if g in keywords:
-                categories_of_genre.add(category)
-    
-    return ",".join(categories_of_genre) if categories_of_genre else "Other"
-
+from genres import normalize_genres
+from title_keys import normalize_titles
+from json_stream import iter_json_array
+from intermediates import COLUMNAR, NETFLIX_ORIGINALS_SCHEMA, cleaned_path, write_table
 
 FILE_TO_CLEAN_PATH = 'etl/datasets/netflix_originals.json'
-CLEANED_FILE_PATH = 'etl/datasets/netflix_originals_cleaned.json'
-netflix_canceled_shows_path = "etl/datasets/netflix_cancelled_shows.csv"
-
-def normalize_and_clean_title(title):
-    if not isinstance(title, str):
-        return ""
-    title = unicodedata.normalize('NFD', title).encode('ascii', 'ignore').decode('ascii')
-    title = title.lower()
-    title = re.sub(r'[^\w]', '', title)
-    title.strip()
-    title = title.replace("theseries", "").replace("themovie", "")
-    return title
-
-# Load cancelled shows
-cancelled_shows = pd.read_csv(netflix_canceled_shows_path)
-cancelled_shows['title_cleaned'] = cancelled_shows['Title'].apply(normalize_and_clean_title)
-cancelled_titles_set = set(cancelled_shows['title_cleaned'])
-
-df = pd.read_json(FILE_TO_CLEAN_PATH)
+CLEANED_FILE_PATH = cleaned_path('netflix_originals_cleaned', 'json')
+CANCELLED_SHOWS_PATH = "etl/datasets/netflix_cancelled_shows.csv"
 
 # Keep only the columns we need
-columns_to_keep = ['title', 'type', 'titlereleased', 'netflixid', 'category', 'date_released']
-df = df[columns_to_keep]
+COLUMNS_TO_KEEP = ['title', 'type', 'titlereleased', 'netflixid', 'category', 'date_released']
+# Rename types to match IMDb data
+TYPE_MAPPING = {"Movie": "movie", "TV": "tvSeries"}
+
+def load_netflix_titles(file_path):
+    # Items are parsed one by one and only the kept fields survive, the full object tree is never built
+    records = ({column: item.get(column) for column in COLUMNS_TO_KEEP} for item in iter_json_array(file_path))
+    return pd.DataFrame.from_records(records, columns=COLUMNS_TO_KEEP)
+
+def load_cancelled_titles(cancelled_shows_path):
+    cancelled_shows = pd.read_csv(cancelled_shows_path, usecols=['Title'])
+    return normalize_titles(cancelled_shows['Title'])
+
+def on_strings(values, transformed):
+    # .str methods give NaN for anything that is not a string, those values are kept as they were
+    return transformed.fillna(values)
+
+def clean_titles(df, cancelled_titles):
+    # Remove unwanted text from title and narrow date
+    df = df[~df['titlereleased'].str.contains("Limited Series", na=False)].copy()
+    df['title'] = on_strings(df['title'], df['title'].str.rstrip())
+    df['title_cleaned'] = normalize_titles(df['title'])
+    df['date_released'] = on_strings(df['date_released'], df['date_released'].str[:4])
+
+    # Fall back to the release date when titlereleased is blank
+    blank_released = df['titlereleased'].str.strip().eq("")
+    df['titlereleased'] = df['titlereleased'].mask(blank_released, df['date_released'])
+    df['titlereleased'] = on_strings(df['titlereleased'], df['titlereleased'].str[:4])
+
+    df['category'] = normalize_genres(df['category'])
+
+    # Set to cancelled if title is in cancelled shows
+    df['cancelled'] = df['title_cleaned'].isin(cancelled_titles)
 
-# Remove unwanted text from title and narrow date 
-df = df[~df['titlereleased'].str.contains("Limited Series", na=False)]
-df['title'] = df['title'].apply(lambda x: x.rstrip() if isinstance(x, str) else x)
-df['title_cleaned'] = df['title'].apply(normalize_and_clean_title)
-df['date_released'] = df['date_released'].apply(lambda x: x[:4] if isinstance(x, str) else x)
-df['titlereleased'] = df.apply(
-    lambda row: row['date_released'] if isinstance(row['titlereleased'], str) and row['titlereleased'].strip() == "" else row['titlereleased'],
-    axis=1
-)
-df['titlereleased'] = df['titlereleased'].apply(lambda x: x[:4] if isinstance(x, str) else x)
+    df['type'] = df['type'].replace(TYPE_MAPPING)
+    return df
 
-df['category'] = df['category'].apply(normalize_genre)
+def clean_netflix_titles(file_path, cancelled_shows_path, cleaned_file_path):
+    df = clean_titles(load_netflix_titles(file_path), load_cancelled_titles(cancelled_shows_path))
+    if COLUMNAR:
+        write_table(df, NETFLIX_ORIGINALS_SCHEMA, cleaned_file_path)
+        return
+    df.to_json(cleaned_file_path, orient='records', indent=4, force_ascii=False)
 
-# Set to cancelled if title is in cancelled shows
-df['cancelled'] = df['title_cleaned'].apply(lambda x: x in cancelled_titles_set)
+    print(f"Cleaned data saved to {cleaned_file_path}")
 
-# Rename columns to match IMDb data
-df['type'] = df['type'].apply(lambda x: 'movie' if x == "Movie" else 'tvSeries' if x == "TV" else x)
+def main():
+    clean_netflix_titles(FILE_TO_CLEAN_PATH, CANCELLED_SHOWS_PATH, CLEANED_FILE_PATH)
 
-df.to_json(CLEANED_FILE_PATH, orient='records', indent=4, force_ascii=False)
+if __name__ == "__main__":
+    main()
 
 #os.remove(FILE_TO_CLEAN_PATH)
@@ -0,0 +1,27 @@
+import io
+
+# psycopg2 COPY helpers for load_database, the rows go through the session's own transaction
+NULL = "\\N"
+
+
+def dbapi_cursor(session):
+    return session.connection().connection.cursor()
+
+def reserve_ids(cursor, table, count):
+    """Take count ids from the table's serial sequence in one round trip, so rows can be linked before COPY."""
+    cursor.execute(
+        "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+        (table, count),
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+def copy_frame(cursor, table, df):
+    """COPY the DataFrame columns into the same named table columns, missing values become NULL."""
+    if df.empty:
+        return 0
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False, na_rep=NULL)
+    buffer.seek(0)
+    columns = ", ".join(df.columns)
+    cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '{NULL}')", buffer)
+    return len(df)
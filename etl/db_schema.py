@@ -1,6 +1,6 @@
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
-from sqlalchemy import BigInteger, Column, Integer, String, Float, ForeignKey, Table, Boolean
+from sqlalchemy import BigInteger, text, Column, Index, Integer, String, Float, ForeignKey, Table, Boolean
 
 
 Base = declarative_base()
@@ -8,12 +8,28 @@ Base = declarative_base()
 movie_categories = Table(
     'movie_categories', Base.metadata,
     Column('movie_id', Integer, ForeignKey('movies.id'), primary_key=True),
-    Column('category_id', Integer, ForeignKey('categories.id'), primary_key=True)
+    Column('category_id', Integer, ForeignKey('categories.id'), primary_key=True),
+    # The primary key leads with movie_id, joins and deletes coming from a category need it the other way round
+    Index('ix_movie_categories_category_movie', 'category_id', 'movie_id')
 )
 
 class Movie(Base):
     __tablename__ = 'movies'
+    # Natural keys for incremental loads: IMDb tconst, or netflix_id for titles only Netflix knows
+    __table_args__ = (
+        Index('ix_movies_tconst', 'tconst', unique=True),
+        Index('ix_movies_netflix_only', 'netflix_id', unique=True, postgresql_where=text('tconst IS NULL')),
+        # Dashboard filters, the Netflix-only views read the partial ones. The included columns are the ones the
+        # queries aggregate, so the planner can answer from the index alone.
+        Index('ix_movies_netflix_type_rating', 'type', 'imdb_rating', postgresql_where=text('netflix_id IS NOT NULL'),
+              postgresql_include=['id', 'released_year', 'runtime_minutes', 'cancelled']),
+        Index('ix_movies_netflix_released_rating', 'released_year', 'imdb_rating',
+              postgresql_where=text('netflix_id IS NOT NULL'), postgresql_include=['title']),
+        Index('ix_movies_type_rating', 'type', 'imdb_rating',
+              postgresql_include=['id', 'released_year', 'runtime_minutes']),
+    )
     id = Column(Integer, primary_key=True)
+    tconst = Column(String, nullable=True)
     title = Column(String, nullable=False)
     type = Column(String)
     released_year = Column(Integer)
@@ -29,6 +45,24 @@ class Category(Base):
     name = Column(String, unique=True, nullable=False)
     movies = relationship('Movie', secondary=movie_categories, back_populates='categories')
 
+class GenreRollup(Base):
+    """Sums and counts of the movies of every genre, rebuilt by each load for the IMDb analytics charts."""
+    __tablename__ = 'genre_rollup'
+    id = Column(Integer, primary_key=True)
+    category = Column(String, nullable=False)
+    type = Column(String)
+    netflix = Column(Boolean, nullable=False)
+    cancelled = Column(Boolean)
+    released_year = Column(Integer)
+    movie_count = Column(Integer, nullable=False)
+    rated_count = Column(Integer, nullable=False)
+    rating_sum = Column(Float, nullable=False)
+    # Ratings other than 0, the Netflix active / cancelled chart leaves unrated zeros out
+    nonzero_rated_count = Column(Integer, nullable=False)
+    nonzero_rating_sum = Column(Float, nullable=False)
+    runtime_count = Column(Integer, nullable=False)
+    runtime_sum = Column(BigInteger, nullable=False)
+
 class Company(Base):
     __tablename__ = 'companies'
     id = Column(Integer, primary_key=True)
@@ -38,6 +72,9 @@ class Company(Base):
 
 class StockPrice(Base):
     __tablename__ = 'stock_prices'
+    __table_args__ = (
+        Index('ix_stock_prices_company_trade_time', 'company_id', 'trade_time'),
+    )
     id = Column(Integer, primary_key=True)
     open = Column(Float, nullable=False)
     high = Column(Float, nullable=False)
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import time
+import zlib
+
+import psutil
+import requests
+
+from manifest import MANIFEST_PATH, conditional_headers, get_entry, update_entry
+
+CHUNK_SIZE = 1024 * 1024
+GZIP_WBITS = zlib.MAX_WBITS | 16
+
+
+def format_bytes(num_bytes):
+    return f"{num_bytes / (1024 * 1024):.1f} MiB"
+
+def print_transfer_report(stats):
+    print(
+        f"Transferred {format_bytes(stats['compressed_bytes'])} "
+        f"(extracted {format_bytes(stats['extracted_bytes'])}) in {stats['seconds']:.2f} s, "
+        f"{format_bytes(stats['bytes_per_sec'])}/s, peak RSS {format_bytes(stats['peak_rss'])}"
+    )
+
+class GzipFileWriter:
+    """Decompresses gzip bytes as they arrive and writes them to extracted_file.
+
+    Keeps a hash of the compressed bytes, transfer counters and the peak RSS seen while writing.
+    """
+
+    def __init__(self, extracted_file):
+        self.file = open(extracted_file, "wb")
+        self.decompressor = zlib.decompressobj(GZIP_WBITS)
+        self.sha256 = hashlib.sha256()
+        self.process = psutil.Process()
+        self.peak_rss = self.process.memory_info().rss
+        self.compressed_bytes = 0
+        self.extracted_bytes = 0
+        self.in_member = False
+        self.start_time = time.perf_counter()
+
+    def _write(self, data):
+        self.file.write(data)
+        self.extracted_bytes += len(data)
+
+    def write(self, chunk):
+        self.compressed_bytes += len(chunk)
+        self.sha256.update(chunk)
+        # A .gz file may hold several members back to back, start a new decompressor for each one
+        while chunk:
+            self.in_member = True
+            self._write(self.decompressor.decompress(chunk))
+            chunk = b""
+            if self.decompressor.eof:
+                self.in_member = False
+                chunk = self.decompressor.unused_data
+                self.decompressor = zlib.decompressobj(GZIP_WBITS)
+        self.peak_rss = max(self.peak_rss, self.process.memory_info().rss)
+
+    def close(self):
+        self._write(self.decompressor.flush())
+        self.file.close()
+        seconds = time.perf_counter() - self.start_time
+        stats = {
+            "sha256": self.sha256.hexdigest(),
+            "compressed_bytes": self.compressed_bytes,
+            "extracted_bytes": self.extracted_bytes,
+            "seconds": seconds,
+            "bytes_per_sec": self.compressed_bytes / seconds if seconds > 0 else 0.0,
+            "peak_rss": max(self.peak_rss, self.process.memory_info().rss),
+        }
+        print_transfer_report(stats)
+        return stats
+
+def write_gzip_response(response, extracted_file, chunk_size=CHUNK_SIZE):
+    writer = GzipFileWriter(extracted_file)
+    try:
+        # decode_content=False: we want the raw gzip bytes even if the server sets Content-Encoding
+        for chunk in response.raw.stream(chunk_size, decode_content=False):
+            writer.write(chunk)
+    finally:
+        stats = writer.close()
+    return stats
+
+def extract_gzip_to_file(compressed_file, extracted_file, chunk_size=CHUNK_SIZE):
+    writer = GzipFileWriter(extracted_file)
+    try:
+        with open(compressed_file, "rb") as f_in:
+            for chunk in iter(lambda: f_in.read(chunk_size), b""):
+                writer.write(chunk)
+    finally:
+        stats = writer.close()
+    # zlib checks the CRC of every member, a stream cut inside a member is the one thing it misses
+    if writer.in_member:
+        raise ValueError(f"{compressed_file} ends in the middle of a gzip member")
+    return stats
+
+def write_json_bytes(body, file_path):
+    with open(file_path, "w", encoding="utf-8") as file:
+        json.dump(json.loads(body), file, ensure_ascii=False, indent=2)
+    return {"sha256": hashlib.sha256(body).hexdigest(), "compressed_bytes": len(body)}
+
+def write_json_response(response, file_path):
+    return write_json_bytes(response.content, file_path)
+
+def stream_gzip_to_file(url, extracted_file, chunk_size=CHUNK_SIZE):
+    with requests.get(url, stream=True) as response:
+        response.raise_for_status()
+        stats = write_gzip_response(response, extracted_file, chunk_size)
+    print(f"Streamed {url} to {extracted_file}")
+    return stats
+
+def conditional_download(url, file_path, write_response, headers=None, manifest_path=MANIFEST_PATH):
+    """Download url into file_path unless the manifest shows upstream is unchanged.
+
+    Returns True if file_path was (re)written, False if the existing product was kept.
+    """
+    entry = get_entry(file_path, manifest_path) or {}
+    request_headers = dict(headers or {})
+    if entry and os.path.exists(file_path):
+        request_headers.update(conditional_headers(entry, url))
+
+    with requests.get(url, headers=request_headers, stream=True) as response:
+        if response.status_code == 304:
+            print(f"{url} not modified, keeping {file_path}")
+            update_entry(file_path, manifest_path, url=url, changed=False)
+            return False
+        response.raise_for_status()
+
+        # Write next to the product first so an unchanged or broken download never clobbers it
+        part_path = file_path + ".part"
+        stats = write_response(response, part_path)
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+
+    return finish_download(url, file_path, entry, stats, etag, last_modified, manifest_path)
+
+def finish_download(url, file_path, entry, stats, etag, last_modified, manifest_path=MANIFEST_PATH):
+    """Swap the freshly written .part file in if its content differs from the manifest entry."""
+    part_path = file_path + ".part"
+    changed = not (entry.get("sha256") == stats["sha256"] and os.path.exists(file_path))
+    if changed:
+        os.replace(part_path, file_path)
+        print(f"Downloaded {url} to {file_path}")
+    else:
+        os.remove(part_path)
+        print(f"{url} content hash unchanged, keeping {file_path}")
+
+    update_entry(
+        file_path,
+        manifest_path,
+        url=url,
+        etag=etag,
+        last_modified=last_modified,
+        size=stats["compressed_bytes"],
+        sha256=stats["sha256"],
+        changed=changed,
+    )
+    return changed
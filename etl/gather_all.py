@@ -0,0 +1,79 @@
+# + tags=["parameters"]
+# declare a list tasks whose products you want to use as inputs
+upstream = None
+
+# -
+
+import asyncio
+import os
+import time
+
+import gather_imdb_ratings
+import gather_imdb_titles
+import gather_netflix_stock_data
+import gather_netflix_titles
+import scrape_headings
+from async_fetch import (AsyncFetcher, conditional_fetch, ranged_gzip_fetch, run_coroutine, write_gzip_stream,
+                         write_json_stream)
+
+OUTPUT_DIR = "etl/datasets"
+LIMIT = 16
+# Room for every title.basics range plus the ratings dump on datasets.imdbws.com
+LIMIT_PER_HOST = gather_imdb_titles.RANGE_PARTS + 2
+RETRIES = 4
+
+async def scrape_cancelled_shows():
+    # The scraper keeps its own page cache and worker pool for the paginated list
+    headings = await asyncio.to_thread(scrape_headings.scrape_all_headings, scrape_headings.URL, scrape_headings.HEADERS)
+    scrape_headings.save_headings_to_csv(headings, scrape_headings.OUTPUT_FILE)
+    print(f"{len(headings)} headings written to {scrape_headings.OUTPUT_FILE}")
+    return True
+
+def build_sources(fetcher, stock_url):
+    return {
+        "imdb_titles": ranged_gzip_fetch(
+            fetcher, gather_imdb_titles.URL, gather_imdb_titles.EXTRACTED_FILE, gather_imdb_titles.RANGE_PARTS),
+        "imdb_ratings": conditional_fetch(
+            fetcher, gather_imdb_ratings.URL, gather_imdb_ratings.EXTRACTED_FILE, write_gzip_stream, raw=True),
+        "netflix_titles": conditional_fetch(
+            fetcher, gather_netflix_titles.URL, gather_netflix_titles.OUTPUT_FILE, write_json_stream),
+        "netflix_stock_data": conditional_fetch(
+            fetcher, stock_url, gather_netflix_stock_data.OUTPUT_FILE, write_json_stream),
+        "cancelled_shows": scrape_cancelled_shows(),
+    }
+
+async def timed(name, coroutine):
+    start_time = time.perf_counter()
+    try:
+        return await coroutine
+    finally:
+        print(f"{name} finished in {time.perf_counter() - start_time:.2f} seconds.")
+
+async def gather_all():
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    # The stock time range comes from the stored watermark, a blocking database read
+    stock_url = await asyncio.to_thread(gather_netflix_stock_data.build_url)
+    async with AsyncFetcher(limit=LIMIT, limit_per_host=LIMIT_PER_HOST, retries=RETRIES) as fetcher:
+        sources = build_sources(fetcher, stock_url)
+        results = await asyncio.gather(
+            *(timed(name, coroutine) for name, coroutine in sources.items()),
+            return_exceptions=True,
+        )
+    results = dict(zip(sources, results))
+
+    failed = {name: result for name, result in results.items() if isinstance(result, BaseException)}
+    for name, error in failed.items():
+        print(f"{name} failed: {error!r}")
+    if failed:
+        raise RuntimeError(f"Gathering failed for: {', '.join(failed)}")
+    return results
+
+def main():
+    start_time = time.time()
+    results = run_coroutine(gather_all())
+    for name, changed in results.items():
+        print(f"{name}: {'updated' if changed else 'unchanged'}")
+    print(f"All sources gathered in {time.time() - start_time:.2f} seconds.")
+
+if __name__ == "__main__":
+    main()
@@ -9,10 +9,14 @@ import requests
 import gzip
 import shutil
 
+from download_utils import conditional_download, write_gzip_response
+
 URL = "https://datasets.imdbws.com/title.ratings.tsv.gz"
 OUTPUT_DIR = "etl/datasets"
 COMPRESSED_FILE = "title.ratings.tsv.gz"
 EXTRACTED_FILE = os.path.join(OUTPUT_DIR, "imdb_ratings.tsv")
+# Decompress while downloading instead of buffering the whole .gz and extracting it afterwards
+STREAMING = True
 
 def create_output_dir(directory):
     os.makedirs(directory, exist_ok=True)
@@ -34,8 +38,11 @@ def remove_file(file_path):
     os.remove(file_path)
     print(f"Removed temporary file: {file_path}")
 
-def download_and_extract():
+def download_and_extract(streaming=STREAMING):
     create_output_dir(OUTPUT_DIR)
+    if streaming:
+        conditional_download(URL, EXTRACTED_FILE, write_gzip_response)
+        return
     download_file(URL, COMPRESSED_FILE)
     extract_gzip_file(COMPRESSED_FILE, EXTRACTED_FILE)
     remove_file(COMPRESSED_FILE)
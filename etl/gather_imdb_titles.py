@@ -9,10 +9,17 @@ import requests
 import gzip
 import shutil
 
+from async_fetch import AsyncFetcher, ranged_gzip_fetch, run_coroutine
+from download_utils import conditional_download, write_gzip_response
+
 URL = "https://datasets.imdbws.com/title.basics.tsv.gz"
 OUTPUT_DIR = "etl/datasets"
 COMPRESSED_FILE = "title.basics.tsv.gz"
 EXTRACTED_FILE = os.path.join(OUTPUT_DIR, "imdb_titles.tsv")
+# Decompress while downloading instead of buffering the whole .gz and extracting it afterwards
+STREAMING = True
+# Fetch the dump as parallel byte ranges that survive an interrupted run, 1 turns it off
+RANGE_PARTS = 4
 
 def create_output_dir(directory):
     os.makedirs(directory, exist_ok=True)
@@ -34,8 +41,18 @@ def remove_file(file_path):
     os.remove(file_path)
     print(f"Removed temporary file: {file_path}")
 
-def download_and_extract():
+async def ranged_download(parts):
+    async with AsyncFetcher(limit_per_host=parts) as fetcher:
+        return await ranged_gzip_fetch(fetcher, URL, EXTRACTED_FILE, parts)
+
+def download_and_extract(streaming=STREAMING, range_parts=RANGE_PARTS):
     create_output_dir(OUTPUT_DIR)
+    if range_parts > 1:
+        run_coroutine(ranged_download(range_parts))
+        return
+    if streaming:
+        conditional_download(URL, EXTRACTED_FILE, write_gzip_response)
+        return
     download_file(URL, COMPRESSED_FILE)
     extract_gzip_file(COMPRESSED_FILE, EXTRACTED_FILE)
     remove_file(COMPRESSED_FILE)
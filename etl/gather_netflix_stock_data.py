@@ -5,32 +5,49 @@ upstream = None
 # -
 
 import os
+import time
 import requests
-import json
 
-URL = "https://webql-redesign.cnbcfm.com/graphql?operationName=getQuoteChartData&variables=%7B%22symbol%22%3A%22NFLX%22%2C%22timeRange%22%3A%225Y%22%7D&extensions=%7B%22persistedQuery%22%3A%7B%22version%22%3A1%2C%22sha256Hash%22%3A%2261b6376df0a948ce77f977c69531a4a8ed6788c5ebcdd5edd29dd878ce879c8d%22%7D%7D"
+from download_utils import conditional_download, write_json_response
+from stock_watermark import read_stored_watermark
+
+URL_TEMPLATE = "https://webql-redesign.cnbcfm.com/graphql?operationName=getQuoteChartData&variables=%7B%22symbol%22%3A%22{symbol}%22%2C%22timeRange%22%3A%22{time_range}%22%7D&extensions=%7B%22persistedQuery%22%3A%7B%22version%22%3A1%2C%22sha256Hash%22%3A%2261b6376df0a948ce77f977c69531a4a8ed6788c5ebcdd5edd29dd878ce879c8d%22%7D%7D"
+SYMBOL = "NFLX"
+FULL_TIME_RANGE = "5Y"
+URL = URL_TEMPLATE.format(symbol=SYMBOL, time_range=FULL_TIME_RANGE)
+# Only ask for the bars newer than what load_database already stored, see pick_time_range
+INCREMENTAL = True
+# Shortest CNBC ranges first with the days they cover. 1D/5D are left out, they come back as intraday bars
+TIME_RANGES = [("1M", 30), ("3M", 91), ("6M", 182), ("1Y", 365), (FULL_TIME_RANGE, 5 * 365)]
+DAY_MILLS = 24 * 60 * 60 * 1000
 OUTPUT_DIR = "etl/datasets"
 OUTPUT_FILE = os.path.join(OUTPUT_DIR, "netflix_stock_data.json")
 
 def create_output_dir(directory):
     os.makedirs(directory, exist_ok=True)
 
-def fetch_json(url):
-    response = requests.get(url, stream=True)
-    response.raise_for_status()
-    return response.json()
-
-def save_json_to_file(data, file_path):
-    with open(file_path, "w", encoding="utf-8") as file:
-        json.dump(data, file, ensure_ascii=False, indent=2)
+def pick_time_range(latest_mills, now_mills):
+    if latest_mills is None:
+        return FULL_TIME_RANGE
+    # One extra day so the last stored bar is always inside the window
+    gap_days = (now_mills - latest_mills) / DAY_MILLS + 1
+    for time_range, days in TIME_RANGES:
+        if gap_days <= days:
+            return time_range
+    return FULL_TIME_RANGE
+
+def build_url(incremental=INCREMENTAL):
+    if not incremental:
+        return URL
+    time_range = pick_time_range(read_stored_watermark(SYMBOL), int(time.time() * 1000))
+    print(f"Requesting the {time_range} range of {SYMBOL} price bars")
+    return URL_TEMPLATE.format(symbol=SYMBOL, time_range=time_range)
 
 def download_json():
     create_output_dir(OUTPUT_DIR)
     print("Downloading file...")
     try:
-        data = fetch_json(URL)
-        save_json_to_file(data, OUTPUT_FILE)
-        print(f"Downloaded and saved file to {OUTPUT_FILE}")
+        conditional_download(build_url(), OUTPUT_FILE, write_json_response)
     except requests.RequestException as e:
         print(f"An error occurred: {e}")
 
@@ -0,0 +1,82 @@
+import pandas as pd
+
+OTHER = "Other"
+
+GENRE_MAPPING = {
+    'Drama': ['Drama', 'Dramas'],
+    'Comedy': ['Comedy', 'Stand-up Comedy', 'Stand-up', 'Standup'],
+    'Action': ['Action'],
+    'Romance': ['Romance', 'Romantic'],
+    'Sci-Fi/Fantasy': ['Sci-Fi', 'Sci-fi', 'Fantasy'],
+    'Thriller': ['Thriller', 'Thrillers'],
+    'Horror': ['Horror'],
+    'Mystery': ['Mystery'],
+    'Crime': ['Crime', 'True Crime', 'True-crime', 'Con-Artist'],
+    'Documentary': ['Documentary', 'Docuseries', 'Docudrama', 'Behind the Scenes', 'Making-of', 'Making-Of'],
+    'Biographical': ['Biography'],
+    'Historical': ['History', 'Historical'],
+    'Family/Children': ['Family', 'Kids', 'Children'],
+    'Animation': ['Animation', 'Animated', 'Cartoon', 'Anime'],
+    'Adventure': ['Adventure'],
+    'Teen': ['Teen'],
+    'Medical': ['Medical'],
+    'LGBTQ': ['LGBTQ'],
+    'Stand-up Comedy': ['Stand-up', 'Standup', 'Stand-up Special'],
+    'Sports': ['Sport', 'Boxing', 'Sports'],
+    'Reality TV': ['Reality-TV', 'Reality TV', 'Reality'],
+    'Game Show': ['Game-Show'],
+    'Talk Show': ['Talk Show', 'Talk Shows'],
+    'Variety': ['Variety'],
+    'Political': ['Political'],
+    'Music': ['Music'],
+    'Specials': ['Special', 'Making-of', 'Behind-the-scenes'],
+    'Regional': ['Bollywood', 'Nollywood', 'Spanish', 'French', 'Latin American TV'],
+    'Food/Travel': ['Food', 'Travel'],
+    'Courtroom': ['Courtroom'],
+    'Movies/TV': ['Movies', 'TV'],
+    'Stories/BLM': ['Stories', 'BLM'],
+    'Zombie': ['Zombie'],
+    'Korean': ['Korean', 'K-Drama'],
+}
+
+# Categories are always listed in GENRE_MAPPING order so the output is deterministic
+CATEGORY_ORDER = {category: position for position, category in enumerate(GENRE_MAPPING)}
+
+# Inverted index, one keyword can point to several categories (e.g. "Stand-up", "Making-of")
+KEYWORD_INDEX = {}
+for _category, _keywords in GENRE_MAPPING.items():
+    for _keyword in _keywords:
+        KEYWORD_INDEX.setdefault(_keyword, []).append(_category)
+
+
+def normalize_genre(genre):
+    """Map one comma separated genre string to our categories."""
+    genres_parsed = [g.strip() for g in genre.split(",")] if isinstance(genre, str) and genre else []
+    categories_of_genre = {category for g in genres_parsed for category in KEYWORD_INDEX.get(g, [])}
+    if not categories_of_genre:
+        return OTHER
+    return ",".join(sorted(categories_of_genre, key=CATEGORY_ORDER.get))
+
+def normalize_genres(genres):
+    """Vectorized normalize_genre for a whole column.
+
+    The column is factorized first, so the split/explode/map/regroup runs once per distinct genre string.
+    """
+    codes, uniques = pd.factorize(genres.fillna(""))
+    keywords = pd.Series(uniques, dtype=object).str.split(",").explode().str.strip()
+    categories = keywords.map(KEYWORD_INDEX).explode().dropna()
+
+    pairs = pd.DataFrame({
+        "row": categories.index,
+        "category": categories.to_numpy(),
+        "order": categories.map(CATEGORY_ORDER).to_numpy(),
+    })
+    pairs = pairs.drop_duplicates(["row", "category"]).sort_values(["row", "order"])
+    normalized = pairs.groupby("row")["category"].agg(",".join).reindex(range(len(uniques)), fill_value=OTHER)
+
+    return pd.Series(normalized.to_numpy()[codes], index=genres.index, name=genres.name)
+
+def genre_names(genres):
+    """Distinct category names in a column of comma separated categories."""
+    names = genres.dropna().str.split(",").explode().str.strip()
+    return set(names[names != ""])
@@ -0,0 +1,120 @@
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Pass cleaned products between tasks as typed, compressed Parquet instead of CSV / indented JSON.
+# pipeline.yaml names the .parquet products, switch them back to the legacy names with this flag.
+COLUMNAR = True
+COMPRESSION = "zstd"
+DATASETS_DIR = "etl/datasets"
+
+IMDB_TITLES_SCHEMA = pa.schema([
+    ("tconst", pa.string()),
+    ("titleType", pa.dictionary(pa.int8(), pa.string())),
+    ("primaryTitle", pa.string()),
+    ("startYear", pa.int16()),
+    ("runtimeMinutes", pa.int32()),
+    ("genres", pa.string()),
+    ("primaryTitle_cleaned", pa.string()),
+    ("averageRating", pa.float64()),
+])
+
+NETFLIX_ORIGINALS_SCHEMA = pa.schema([
+    ("title", pa.string()),
+    ("type", pa.string()),
+    ("titlereleased", pa.int16()),
+    ("netflixid", pa.int64()),
+    ("category", pa.string()),
+    ("date_released", pa.string()),
+    ("title_cleaned", pa.string()),
+    ("cancelled", pa.bool_()),
+])
+
+STOCK_PRICES_SCHEMA = pa.schema([
+    ("open", pa.float64()),
+    ("high", pa.float64()),
+    ("low", pa.float64()),
+    ("close", pa.float64()),
+    ("volume", pa.int64()),
+    ("tradeTime", pa.string()),
+    ("tradeTimeinMills", pa.int64()),
+    ("tradeTimestamp", pa.timestamp("ms", tz="UTC")),
+])
+
+# Nullable pandas dtypes on the way back, so missing years / runtimes stay <NA> instead of float NaN
+PANDAS_TYPES = {
+    pa.int8(): pd.Int8Dtype(),
+    pa.int16(): pd.Int16Dtype(),
+    pa.int32(): pd.Int32Dtype(),
+    pa.int64(): pd.Int64Dtype(),
+    pa.float32(): pd.Float32Dtype(),
+    pa.float64(): pd.Float64Dtype(),
+    pa.bool_(): pd.BooleanDtype(),
+}
+
+
+def cleaned_path(name, legacy_extension):
+    extension = "parquet" if COLUMNAR else legacy_extension
+    return os.path.join(DATASETS_DIR, f"{name}.{extension}")
+
+def coerce_column(series, data_type):
+    """Coerce one column to the declared type, values that do not fit become null."""
+    if pa.types.is_integer(data_type) or pa.types.is_floating(data_type):
+        return pd.to_numeric(series.replace("\\N", None), errors="coerce")
+    if pa.types.is_timestamp(data_type):
+        return pd.to_datetime(series, errors="coerce", utc=True)
+    if pa.types.is_boolean(data_type):
+        return series.astype("boolean")
+    if pa.types.is_dictionary(data_type):
+        return series.astype("category")
+    return series.where(series.isna(), series.astype(str))
+
+def to_table(df, schema, metadata=None):
+    columns = {field.name: coerce_column(df[field.name], field.type) for field in schema}
+    table = pa.Table.from_pandas(pd.DataFrame(columns), schema=schema, preserve_index=False)
+    if metadata:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), **metadata})
+    return table
+
+def write_table(df, schema, file_path, metadata=None):
+    pq.write_table(to_table(df, schema, metadata), file_path, compression=COMPRESSION)
+    print(f"Cleaned data saved to {file_path}")
+
+class TableWriter:
+    """Appends DataFrame chunks to one Parquet file as row groups."""
+
+    def __init__(self, file_path, schema):
+        self.schema = schema
+        self.writer = pq.ParquetWriter(file_path, schema, compression=COMPRESSION)
+
+    def write(self, df):
+        self.writer.write_table(to_table(df, self.schema))
+
+    def close(self, metadata=None):
+        # Key-value metadata lands in the footer, it can describe everything written before
+        if metadata:
+            self.writer.add_key_value_metadata(metadata)
+        self.writer.close()
+
+def read_table(file_path, columns=None):
+    table = pq.read_table(file_path, columns=columns, memory_map=True)
+    return table.to_pandas(types_mapper=PANDAS_TYPES.get)
+
+def read_metadata(file_path):
+    # The file's key-value metadata: the table's schema metadata and what TableWriter.close added
+    metadata = pq.read_metadata(file_path, memory_map=True).metadata or {}
+    return {key.decode(): value.decode() for key, value in metadata.items()
+            if not key.startswith((b"pandas", b"ARROW:"))}
+
+def row_group_count(file_path):
+    return pq.ParquetFile(file_path, memory_map=True).num_row_groups
+
+def iter_batches(file_path, columns=None, batch_size=10000, row_groups=None):
+    """DataFrames of batch_size rows, only from the given row groups when row_groups is a list of their indexes."""
+    parquet_file = pq.ParquetFile(file_path, memory_map=True)
+    if row_groups is not None and not row_groups:
+        return
+    for batch in parquet_file.iter_batches(batch_size=batch_size, row_groups=row_groups, columns=columns):
+        yield batch.to_pandas(types_mapper=PANDAS_TYPES.get)
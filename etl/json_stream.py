@@ -0,0 +1,180 @@
+import json
+import re
+
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = " \t\n\r"
+DELIMITERS = WHITESPACE + ",]}"
+# What changes the nesting outside a string, and what can end one inside it
+STRUCTURE = re.compile(r'["{}\[\]]')
+STRING_END = re.compile(r'["\\]')
+
+
+class JsonStreamReader:
+    """Walks a JSON document from a file, arrays are read one item at a time so only one item is held in memory."""
+
+    def __init__(self, file, chunk_size=CHUNK_SIZE):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+        # Scan state of a string or container running past the buffer, offset relative to position
+        self.scanned = 0
+        self.depth = 0
+        self.in_string = False
+
+    def read_more(self):
+        data = self.file.read(self.chunk_size)
+        if not data:
+            self.eof = True
+            return False
+        # Drop what has been consumed so the buffer stays around one chunk
+        self.buffer = self.buffer[self.position:] + data
+        self.position = 0
+        return True
+
+    def next_char(self):
+        """Skip whitespace and return the next character without consuming it, "" at the end of the file."""
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in WHITESPACE:
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.read_more():
+                return ""
+
+    def expect(self, char):
+        if self.next_char() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.position} of the JSON stream")
+        self.position += 1
+
+    def scan_value(self):
+        """Carry the scan of the string or container at position on, True once its end is in the buffer."""
+        buffer = self.buffer
+        index = self.position + self.scanned
+        while True:
+            if self.in_string:
+                match = STRING_END.search(buffer, index)
+                if match is None:
+                    index = len(buffer)
+                    break
+                if match.group() == "\\":
+                    if match.end() == len(buffer):
+                        # Escape cut off, scan it again with the next chunk
+                        index = match.start()
+                        break
+                    index = match.end() + 1
+                    continue
+                self.in_string = False
+            else:
+                match = STRUCTURE.search(buffer, index)
+                if match is None:
+                    index = len(buffer)
+                    break
+                char = match.group()
+                if char == '"':
+                    self.in_string = True
+                else:
+                    self.depth += 1 if char in "{[" else -1
+            index = match.end()
+            if self.depth == 0 and not self.in_string:
+                return True
+        self.scanned = index - self.position
+        return False
+
+    def read_value(self):
+        """Read chunks until the string or container at position is complete, False if the file ends first."""
+        self.scanned, self.depth, self.in_string = 0, 0, False
+        while not self.scan_value():
+            if not self.read_more():
+                return False
+        return True
+
+    def decode_value(self):
+        self.next_char()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                # Value cut off at the end of the buffer, read on unless the file is exhausted. Strings and
+                # containers are scanned to their end first: decoding again after every chunk costs quadratic time
+                if self.buffer[self.position] in '{["':
+                    if not self.read_value():
+                        raise
+                    value, end = self.decoder.raw_decode(self.buffer, self.position)
+                elif not self.read_more():
+                    raise
+                else:
+                    continue
+            # A number cut off by the end of the buffer ("12" of "1234", "-0.5" of "-0.5e10") may continue
+            # in the next chunk, so it only counts once a delimiter follows it
+            cut_off = end == len(self.buffer) or (not isinstance(value, (dict, list, str))
+                                                  and self.buffer[end] not in DELIMITERS)
+            if cut_off and not self.eof and self.read_more():
+                continue
+            self.position = end
+            return value
+
+    def separator(self, closing):
+        """Consume the "," between two members, False once the closing bracket is reached."""
+        char = self.next_char()
+        self.position += 1
+        if char == closing:
+            return False
+        if char != ",":
+            raise ValueError(f"Expected ',' or {closing!r} at offset {self.position - 1} of the JSON stream")
+        return True
+
+    def items(self):
+        self.expect("[")
+        if self.next_char() == "]":
+            self.position += 1
+            return
+        yield self.decode_value()
+        while self.separator("]"):
+            yield self.decode_value()
+
+    def keys(self):
+        """Yield the keys of an object, the caller reads each value (decode_value / items) before the next key."""
+        self.expect("{")
+        if self.next_char() == "}":
+            self.position += 1
+            return
+        while True:
+            key = self.decode_value()
+            self.expect(":")
+            yield key
+            if not self.separator("}"):
+                return
+
+    def path_items(self, path, siblings):
+        if not path:
+            yield from self.items()
+            return
+        found = False
+        for key in self.keys():
+            if key == path[0] and not found:
+                found = True
+                yield from self.path_items(path[1:], siblings)
+                continue
+            value = self.decode_value()
+            if len(path) == 1:
+                siblings[key] = value
+        if not found:
+            raise ValueError(f"Key {path[0]!r} not found in the JSON stream")
+
+def iter_json_array(file_path, chunk_size=CHUNK_SIZE):
+    """Yield the items of the top level JSON array in file_path without parsing the whole document first."""
+    with open(file_path, encoding="utf-8") as file:
+        yield from JsonStreamReader(file, chunk_size).items()
+
+def iter_json_path(file_path, path, siblings=None, chunk_size=CHUNK_SIZE):
+    """Yield the items of the array found under the keys in path, e.g. ("data", "chartData", "priceBars").
+
+    The other members of the object holding the array are decoded into siblings. Members after the array
+    are only there once the generator is exhausted.
+    """
+    siblings = {} if siblings is None else siblings
+    with open(file_path, encoding="utf-8") as file:
+        yield from JsonStreamReader(file, chunk_size).path_items(tuple(path), siblings)
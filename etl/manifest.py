@@ -0,0 +1,53 @@
+import json
+import os
+from datetime import datetime, timezone
+
+MANIFEST_PATH = "etl/datasets/manifest.json"
+
+
+def load_manifest(manifest_path=MANIFEST_PATH):
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_manifest(manifest, manifest_path=MANIFEST_PATH):
+    os.makedirs(os.path.dirname(manifest_path) or ".", exist_ok=True)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+def manifest_key(file_path):
+    # Products are referred to with both "/" and os.path.join paths, store them one way
+    return os.path.normpath(file_path).replace(os.sep, "/")
+
+def get_entry(file_path, manifest_path=MANIFEST_PATH):
+    return load_manifest(manifest_path).get(manifest_key(file_path))
+
+def update_entry(file_path, manifest_path=MANIFEST_PATH, **fields):
+    manifest = load_manifest(manifest_path)
+    entry = manifest.get(manifest_key(file_path), {})
+    entry.update(fields)
+    entry["checked_at"] = datetime.now(timezone.utc).isoformat()
+    if fields.get("changed"):
+        entry["updated_at"] = entry["checked_at"]
+    manifest[manifest_key(file_path)] = entry
+    save_manifest(manifest, manifest_path)
+    return entry
+
+def conditional_headers(entry, url=None):
+    """If-None-Match/If-Modified-Since from entry, none if it was stored for another url."""
+    headers = {}
+    if url is not None and entry.get("url") != url:
+        return headers
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+def product_unchanged(file_path, manifest_path=MANIFEST_PATH):
+    """True if the last gather run found upstream unchanged and the product is still on disk."""
+    entry = get_entry(file_path, manifest_path)
+    return bool(entry) and entry.get("changed") is False and os.path.exists(file_path)
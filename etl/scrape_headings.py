@@ -4,14 +4,32 @@ upstream = None
 
 # -
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
 import csv
+import hashlib
+import json
+import os
+import re
 import requests
 
+from manifest import conditional_headers
+
 URL = "https://decider.com/list/canceled-netflix-original-shows/"
+OUTPUT_FILE = 'etl/datasets/netflix_cancelled_shows.csv'
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36"
 }
+CACHE_DIR = 'etl/datasets/http_cache'
+MAX_WORKERS = 4
+MAX_PAGES = 50
+
+# Only build tree nodes for the headings / pagination links instead of the whole article
+HEADING_CLASS = re.compile(r"(^|\s)article-list__heading(\s|$)")
+HEADING_STRAINER = SoupStrainer(class_=HEADING_CLASS)
+LINK_STRAINER = SoupStrainer(["a", "link"], href=True)
+PAGE_PATTERN = re.compile(r"(page/\d+/?|\?page=\d+)$")
 
 def fetch_page(url, headers):
     response = requests.get(url, headers=headers)
@@ -20,11 +38,73 @@ def fetch_page(url, headers):
     else:
         raise Exception("Failed to retrieve the page")
 
+def fetch_page_cached(url, headers, cache_dir=CACHE_DIR):
+    """fetch_page with an on-disk cache keyed by URL, revalidated with the cached ETag/Last-Modified."""
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    body_path = os.path.join(cache_dir, key + ".html")
+    meta_path = os.path.join(cache_dir, key + ".json")
+
+    meta = None
+    if os.path.exists(body_path) and os.path.exists(meta_path):
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+    response = requests.get(url, headers={**headers, **conditional_headers(meta or {})})
+    if response.status_code == 304 and meta:
+        with open(body_path, "rb") as f:
+            return f.read()
+    if response.status_code != 200:
+        raise Exception("Failed to retrieve the page")
+
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(body_path, "wb") as f:
+        f.write(response.content)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }, f)
+    return response.content
+
 def parse_headings(html_content):
-    soup = BeautifulSoup(html_content, "html.parser")
+    soup = BeautifulSoup(html_content, "html.parser", parse_only=HEADING_STRAINER)
     headings = soup.find_all(class_="article-list__heading")
     return [heading.get_text(strip=True).strip("'") for heading in headings]
 
+def parse_page_links(html_content, page_url, list_url):
+    """Links to the other pages of the same list, in document order."""
+    soup = BeautifulSoup(html_content, "html.parser", parse_only=LINK_STRAINER)
+    links = []
+    for tag in soup.find_all(["a", "link"], href=True):
+        link = urljoin(page_url, tag["href"]).split("#")[0]
+        if link.startswith(list_url) and (PAGE_PATTERN.search(link[len(list_url):]) or "next" in tag.get("rel", [])):
+            if link not in links:
+                links.append(link)
+    return links
+
+def scrape_all_headings(url, headers, cache_dir=CACHE_DIR, max_workers=MAX_WORKERS, max_pages=MAX_PAGES):
+    pages = {url: fetch_page_cached(url, headers, cache_dir)}
+    frontier = parse_page_links(pages[url], url, url)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while frontier and len(pages) < max_pages:
+            batch = [link for link in frontier if link not in pages][:max_pages - len(pages)]
+            contents = executor.map(lambda link: fetch_page_cached(link, headers, cache_dir), batch)
+            frontier = []
+            for link, content in zip(batch, contents):
+                pages[link] = content
+                frontier.extend(parse_page_links(content, link, url))
+
+    headings = []
+    seen = set()
+    for content in pages.values():
+        for heading in parse_headings(content):
+            if heading not in seen:
+                seen.add(heading)
+                headings.append(heading)
+    return headings
+
 def save_headings_to_csv(headings, file_path):
     with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
         writer = csv.writer(csvfile)
@@ -34,10 +114,9 @@ def save_headings_to_csv(headings, file_path):
 
 def main():
     try:
-        html_content = fetch_page(URL, HEADERS)
-        headings = parse_headings(html_content)
+        headings = scrape_all_headings(URL, HEADERS)
         print(headings)
-        save_headings_to_csv(headings, 'etl/datasets/netflix_cancelled_shows.csv')
+        save_headings_to_csv(headings, OUTPUT_FILE)
         print("All headings were successfully retrieved and written to 'netflix_cancelled_shows.csv'.")
     except Exception as e:
         print(e)
@@ -0,0 +1,96 @@
+import re
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+# Shadow copies of live tables: loaded without indexes, indexed like the live tables, then swapped in at once
+STAGING_SUFFIX = "_staging"
+# A reader holding one of the tables can deadlock the swap or keep it waiting, the swap then gives up and retries
+SWAP_LOCK_TIMEOUT = "5s"
+SWAP_ATTEMPTS = 5
+SWAP_RETRY_SECONDS = 1.0
+
+LIVE_CONSTRAINTS = """
+SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+WHERE conrelid = CAST(:table AS regclass) AND contype IN ('p', 'u', 'c', 'f')
+ORDER BY contype = 'f', conname
+"""
+# Indexes of their own, the ones behind primary key / unique constraints come with the constraints
+LIVE_INDEXES = """
+SELECT CAST(CAST(i.indexrelid AS regclass) AS text), pg_get_indexdef(i.indexrelid) FROM pg_index i
+WHERE i.indrelid = CAST(:table AS regclass)
+  AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)
+ORDER BY 1
+"""
+
+
+def staging_name(name):
+    return name + STAGING_SUFFIX
+
+def create_staging_tables(session, tables):
+    """Empty copies of the live tables with their columns and NOT NULLs only, parents before children."""
+    for table in reversed(tables):
+        session.execute(text(f"DROP TABLE IF EXISTS {staging_name(table)}"))
+    for table in tables:
+        session.execute(text(f"CREATE TABLE {staging_name(table)} (LIKE {table})"))
+    session.commit()
+
+def referencing_staging(definition, tables):
+    # Foreign keys between swapped tables point at the staging tables, they follow them through the rename
+    for table in tables:
+        definition = re.sub(rf"REFERENCES {table}\(", f"REFERENCES {staging_name(table)}(", definition)
+    return definition
+
+def build_staging_indexes(session, tables):
+    """Give the staging tables the constraints and indexes of the live tables, under _staging names.
+
+    Returns (table, kind, name) of everything created, for swap_staging_tables to restore the live names.
+    """
+    created = []
+    for table in tables:
+        for name, definition in session.execute(text(LIVE_CONSTRAINTS), {"table": table}).all():
+            session.execute(text(f"ALTER TABLE {staging_name(table)} ADD CONSTRAINT {staging_name(name)} "
+                                 f"{referencing_staging(definition, tables)}"))
+            created.append((table, "constraint", name))
+        for name, definition in session.execute(text(LIVE_INDEXES), {"table": table}).all():
+            definition = re.sub(rf"INDEX {re.escape(name)} ON (\w+\.)?{table} ",
+                                rf"INDEX {staging_name(name)} ON \g<1>{staging_name(table)} ", definition)
+            session.execute(text(definition))
+            created.append((table, "index", name))
+        session.commit()
+    return created
+
+def swap_staging_tables(session, tables, serial_tables, created):
+    """Replace the live tables with the staging ones in one transaction.
+
+    Readers block on the table locks for the duration of the swap and then see the new data, never a mix.
+    """
+    for attempt in range(1, SWAP_ATTEMPTS + 1):
+        try:
+            swap_tables(session, tables, serial_tables, created)
+            return
+        except OperationalError as e:
+            session.rollback()
+            if attempt == SWAP_ATTEMPTS:
+                raise
+            print(f"Swap attempt {attempt} gave way to readers ({e.orig.__class__.__name__}), retrying.")
+            time.sleep(SWAP_RETRY_SECONDS * attempt)
+
+def swap_tables(session, tables, serial_tables, created):
+    session.execute(text(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}'"))
+    session.execute(text(f"LOCK TABLE {', '.join(tables)} IN ACCESS EXCLUSIVE MODE"))
+    for table in serial_tables:
+        sequence = session.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": table}).scalar()
+        session.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {staging_name(table)}.id"))
+        session.execute(text(f"ALTER TABLE {staging_name(table)} ALTER COLUMN id SET DEFAULT nextval('{sequence}')"))
+    for table in reversed(tables):
+        session.execute(text(f"DROP TABLE {table}"))
+    for table in tables:
+        session.execute(text(f"ALTER TABLE {staging_name(table)} RENAME TO {table}"))
+    for table, kind, name in created:
+        if kind == "constraint":
+            session.execute(text(f"ALTER TABLE {table} RENAME CONSTRAINT {staging_name(name)} TO {name}"))
+        else:
+            session.execute(text(f"ALTER INDEX {staging_name(name)} RENAME TO {name}"))
+    session.commit()
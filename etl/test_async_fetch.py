@@ -0,0 +1,194 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from async_fetch import (AsyncFetcher, conditional_fetch, fetch_bytes, ranged_gzip_fetch, run_coroutine, split_ranges,
+                         write_gzip_stream, write_json_stream)
+
+PAYLOAD = b"tconst\taverageRating\tnumVotes\n" + b"tt0000001\t5.7\t2100\n" * 2000
+JSON_PAYLOAD = {"titles": [{"netflixid": str(i), "title": "Title"} for i in range(100)]}
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    failures_left = 0
+
+    def do_GET(self):
+        if type(self).failures_left > 0:
+            type(self).failures_left -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+        body = gzip.compress(PAYLOAD) if self.path.endswith(".gz") else b"ok"
+        self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class ContentEncodingHandler(BaseHTTPRequestHandler):
+    """Gzips every body for clients that accept it, .gz files included, as some CDNs do."""
+    accept_encodings = []
+
+    def do_GET(self):
+        accept_encoding = self.headers.get("Accept-Encoding", "")
+        type(self).accept_encodings.append((self.path, accept_encoding))
+        body = gzip.compress(PAYLOAD) if self.path.endswith(".gz") else json.dumps(JSON_PAYLOAD).encode()
+        self.send_response(200)
+        if "gzip" in accept_encoding:
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class RangeHandler(BaseHTTPRequestHandler):
+    body = gzip.compress(PAYLOAD)
+    etag = f'"{hashlib.md5(body).hexdigest()}"'
+    ranges_seen = []
+
+    def send_common_headers(self):
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", self.etag)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_common_headers()
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+
+    def do_GET(self):
+        start, end = (int(value) for value in self.headers["Range"].removeprefix("bytes=").split("-"))
+        type(self).ranges_seen.append((start, end))
+        self.send_response(206)
+        self.send_common_headers()
+        self.send_header("Content-Range", f"bytes {start}-{end}/{len(self.body)}")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        self.wfile.write(self.body[start:end + 1])
+
+    def log_message(self, format, *args):
+        pass
+
+def serve(handler):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+@pytest.fixture
+def range_server_url():
+    RangeHandler.ranges_seen = []
+    server = serve(RangeHandler)
+    yield f"http://127.0.0.1:{server.server_port}/title.basics.tsv.gz"
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def server_url():
+    FlakyHandler.failures_left = 0
+    server = serve(FlakyHandler)
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+def test_request_retries_transient_errors(server_url):
+    FlakyHandler.failures_left = 2
+
+    async def fetch():
+        async with AsyncFetcher(retries=3, backoff=0.01) as fetcher:
+            return await fetch_bytes(fetcher, f"{server_url}/page")
+
+    assert run_coroutine(fetch()) == b"ok"
+    assert FlakyHandler.failures_left == 0
+
+def test_conditional_fetch_sources_concurrently(server_url, tmp_path):
+    manifest_path = str(tmp_path / "manifest.json")
+    products = [str(tmp_path / f"file_{i}.tsv") for i in range(3)]
+
+    async def fetch_all():
+        async with AsyncFetcher(limit_per_host=2, backoff=0.01) as fetcher:
+            return await asyncio.gather(*(
+                conditional_fetch(fetcher, f"{server_url}/{i}.tsv.gz", product, write_gzip_stream, manifest_path,
+                                  raw=True)
+                for i, product in enumerate(products)
+            ))
+
+    assert run_coroutine(fetch_all()) == [True, True, True]
+    for product in products:
+        assert open(product, "rb").read() == PAYLOAD
+    assert run_coroutine(fetch_all()) == [False, False, False]
+
+def test_conditional_fetch_decodes_json_and_keeps_gzip_raw(tmp_path):
+    ContentEncodingHandler.accept_encodings = []
+    server = serve(ContentEncodingHandler)
+    url = f"http://127.0.0.1:{server.server_port}"
+    manifest_path = str(tmp_path / "manifest.json")
+
+    async def fetch_both():
+        async with AsyncFetcher(backoff=0.01) as fetcher:
+            return await asyncio.gather(
+                conditional_fetch(fetcher, f"{url}/titles.json", str(tmp_path / "titles.json"), write_json_stream,
+                                  manifest_path),
+                conditional_fetch(fetcher, f"{url}/ratings.tsv.gz", str(tmp_path / "ratings.tsv"), write_gzip_stream,
+                                  manifest_path, raw=True),
+            )
+
+    try:
+        assert run_coroutine(fetch_both()) == [True, True]
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert json.load(open(tmp_path / "titles.json", encoding="utf-8")) == JSON_PAYLOAD
+    assert open(tmp_path / "ratings.tsv", "rb").read() == PAYLOAD
+    accept_encodings = dict(ContentEncodingHandler.accept_encodings)
+    assert "gzip" in accept_encodings["/titles.json"]
+    assert accept_encodings["/ratings.tsv.gz"] == "identity"
+
+def ranged_fetch(url, product, manifest_path, parts):
+    async def fetch():
+        async with AsyncFetcher(limit_per_host=parts, backoff=0.01) as fetcher:
+            return await ranged_gzip_fetch(fetcher, url, product, parts, manifest_path)
+    return run_coroutine(fetch())
+
+def test_ranged_gzip_fetch_stitches_parallel_ranges(range_server_url, tmp_path):
+    product = str(tmp_path / "imdb_titles.tsv")
+    manifest_path = str(tmp_path / "manifest.json")
+
+    assert ranged_fetch(range_server_url, product, manifest_path, parts=3)
+    assert open(product, "rb").read() == PAYLOAD
+    assert sorted(RangeHandler.ranges_seen) == [(start, end) for start, end, _ in split_ranges(len(RangeHandler.body), 3)]
+    assert sorted(os.listdir(tmp_path)) == ["imdb_titles.tsv", "manifest.json"]
+
+    RangeHandler.ranges_seen = []
+    assert not ranged_fetch(range_server_url, product, manifest_path, parts=3)
+    assert RangeHandler.ranges_seen == []
+
+def test_ranged_gzip_fetch_resumes_from_sidecar(range_server_url, tmp_path):
+    product = str(tmp_path / "imdb_titles.tsv")
+    manifest_path = str(tmp_path / "manifest.json")
+    body = RangeHandler.body
+    ranges = split_ranges(len(body), 2)
+    # First range finished and the second one half way through when the previous run died
+    ranges[0][2] = ranges[0][1] + 1
+    ranges[1][2] = 10
+    with open(product + ".gz.part", "wb") as f:
+        f.write(body[:ranges[1][0] + 10])
+        f.truncate(len(body))
+    with open(product + ".gz.part.json", "w") as f:
+        json.dump({"url": range_server_url, "size": len(body), "etag": RangeHandler.etag,
+                   "last_modified": None, "ranges": ranges}, f)
+
+    assert ranged_fetch(range_server_url, product, manifest_path, parts=2)
+    assert RangeHandler.ranges_seen == [(ranges[1][0] + 10, len(body) - 1)]
+    assert open(product, "rb").read() == PAYLOAD
+    assert not os.path.exists(product + ".gz.part.json")
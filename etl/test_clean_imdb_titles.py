@@ -0,0 +1,128 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+import clean_imdb_titles as cleaner
+from clean_imdb_titles import (clean_imdb_titles, clean_imdb_titles_chunked, clean_imdb_titles_parallel, line_partitions,
+                               ordered_results)
+from genres import genre_names
+from intermediates import read_metadata, read_table
+
+TITLES = """tconst\ttitleType\tprimaryTitle\toriginalTitle\tisAdult\tstartYear\tendYear\truntimeMinutes\tgenres
+tt0000001\tmovie\tThe Old One\tThe Old One\t0\t1975\t\\N\t90\tDrama
+tt0000002\tmovie\tAmélie\tLe Fabuleux Destin\t0\t2001\t\\N\t122\tComedy,Romance
+tt0000003\ttvSeries\tStranger Things\tStranger Things\t0\t2016\t\\N\t51\tDrama,Fantasy,Horror
+tt0000004\ttvEpisode\tChapter One\tChapter One\t0\t2016\t\\N\t48\tDrama
+tt0000005\tmovie\tNo Year\tNo Year\t0\t\\N\t\\N\t100\tAction
+tt0000006\tmovie\tNews Reel\tNews Reel\t0\t1999\t\\N\t10\tNews
+tt0000007\tmovie\tUnrated\tUnrated\t0\t2010\t\\N\t\\N\tThriller
+tt0000008\ttvSeries\tNo Runtime\tNo Runtime\t0\t2020\t2021\t\\N\t\\N
+tt0000009\tmovie\tThe Movie: The Movie\tThe Movie\t0\t1980\t\\N\t95\tSci-Fi,Adventure
+"""
+
+RATINGS = """tconst\taverageRating\tnumVotes
+tt0000001\t7.1\t100
+tt0000002\t8.3\t900000
+tt0000003\t8.7\t1300000
+tt0000004\t8.5\t40000
+tt0000005\t5.0\t10
+tt0000006\t6.0\t10
+tt0000008\t6.6\t55
+tt0000009\t4.2\t12
+"""
+
+@pytest.fixture
+def dumps(tmp_path):
+    titles_file = tmp_path / "imdb_titles.tsv"
+    ratings_file = tmp_path / "imdb_ratings.tsv"
+    titles_file.write_text(TITLES, encoding="utf-8")
+    ratings_file.write_text(RATINGS, encoding="utf-8")
+    return titles_file, ratings_file
+
+@pytest.mark.parametrize("chunksize", [1, 4, 100])
+def test_chunked_matches_full_read(dumps, tmp_path, monkeypatch, chunksize):
+    monkeypatch.setattr(cleaner, "COLUMNAR", False)
+    titles_file, ratings_file = dumps
+    full_output = tmp_path / "full.csv"
+    chunked_output = tmp_path / "chunked.csv"
+
+    clean_imdb_titles(titles_file, ratings_file, full_output)
+    clean_imdb_titles_chunked(titles_file, ratings_file, chunked_output, chunksize=chunksize)
+
+    assert chunked_output.read_text(encoding="utf-8") == full_output.read_text(encoding="utf-8")
+    cleaned = pd.read_csv(chunked_output, dtype=str)
+    assert list(cleaned["tconst"]) == ["tt0000002", "tt0000003", "tt0000008", "tt0000009"]
+
+@pytest.mark.parametrize("chunksize", [1, 4, 100])
+def test_columnar_output_is_typed(dumps, tmp_path, monkeypatch, chunksize):
+    monkeypatch.setattr(cleaner, "COLUMNAR", True)
+    titles_file, ratings_file = dumps
+    full_output = tmp_path / "full.parquet"
+    chunked_output = tmp_path / "chunked.parquet"
+
+    clean_imdb_titles(titles_file, ratings_file, full_output)
+    clean_imdb_titles_chunked(titles_file, ratings_file, chunked_output, chunksize=chunksize)
+
+    full = read_table(full_output)
+    chunked = read_table(chunked_output)
+    pd.testing.assert_frame_equal(chunked.astype({"titleType": str}), full.astype({"titleType": str}))
+    assert list(chunked["tconst"]) == ["tt0000002", "tt0000003", "tt0000008", "tt0000009"]
+    assert str(chunked["startYear"].dtype) == "Int16"
+    assert chunked["runtimeMinutes"].isna().tolist() == [False, False, True, False]
+    assert chunked["averageRating"].tolist() == [8.3, 8.7, 6.6, 4.2]
+
+    columns = read_table(chunked_output, columns=["primaryTitle_cleaned"])
+    assert list(columns.columns) == ["primaryTitle_cleaned"]
+    # The loader creates the categories from the metadata, it has to name every genre of the titles
+    genres = json.loads(read_metadata(chunked_output)["genres"])
+    assert genres == sorted(genre_names(full["genres"]))
+    assert json.loads(read_metadata(full_output)["genres"]) == genres
+
+def test_parallel_columnar_output_names_its_genres(dumps, tmp_path, monkeypatch):
+    monkeypatch.setattr(cleaner, "COLUMNAR", True)
+    titles_file, ratings_file = dumps
+    parallel_output = tmp_path / "parallel.parquet"
+
+    clean_imdb_titles_parallel(titles_file, ratings_file, parallel_output, workers=2, partition_bytes=150)
+
+    genres = read_table(parallel_output)["genres"]
+    assert json.loads(read_metadata(parallel_output)["genres"]) == sorted(genre_names(genres))
+
+def test_line_partitions_cover_every_row(dumps):
+    titles_file, _ = dumps
+    header, ranges = line_partitions(titles_file, partition_bytes=100)
+    data = titles_file.read_bytes()
+    assert header == data.splitlines(keepends=True)[0]
+    assert ranges[0][0] == len(header) and ranges[-1][1] == len(data)
+    assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+    assert all(data[start - 1:start] == b"\n" for start, _ in ranges)
+
+@pytest.mark.parametrize("workers, partition_bytes", [(1, 1 << 20), (2, 1), (2, 150)])
+def test_parallel_matches_serial(dumps, tmp_path, monkeypatch, workers, partition_bytes):
+    monkeypatch.setattr(cleaner, "COLUMNAR", False)
+    titles_file, ratings_file = dumps
+    serial_output = tmp_path / "serial.csv"
+    parallel_output = tmp_path / "parallel.csv"
+
+    clean_imdb_titles(titles_file, ratings_file, serial_output)
+    clean_imdb_titles_parallel(titles_file, ratings_file, parallel_output, workers=workers,
+                               partition_bytes=partition_bytes)
+
+    assert parallel_output.read_text(encoding="utf-8") == serial_output.read_text(encoding="utf-8")
+
+def test_ordered_results_bounds_the_partitions_in_flight():
+    submitted = []
+
+    class CountingExecutor(ThreadPoolExecutor):
+        def submit(self, function, *args):
+            submitted.append(args)
+            return super().submit(function, *args)
+
+    with CountingExecutor(max_workers=3) as executor:
+        results = []
+        for result in ordered_results(executor, pow, [(i, 2) for i in range(10)], window=3):
+            # Submitted but not yet consumed, this one included
+            assert len(submitted) - len(results) <= 3
+            results.append(result)
+    assert results == [i ** 2 for i in range(10)]
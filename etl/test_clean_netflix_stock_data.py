@@ -0,0 +1,67 @@
+import json
+
+import pandas as pd
+import pytest
+from clean_netflix_stock_data import clean_stock_data, load_stock_data, save_cleaned_data, save_cleaned_table
+from intermediates import read_metadata, read_table
+from load_database import stock_price_rows
+
+PAYLOAD = {
+    "data": {
+        "chartData": {
+            "timeRange": "5Y",
+            "priceBars": [
+                {"open": "100.5", "high": "110", "low": "99.25", "close": "105", "volume": "1200",
+                 "tradeTime": "20240102000000", "tradeTimeinMills": "1704153600000", "__typename": "PriceBar"},
+                {"open": "105", "high": None, "low": "101", "close": "103.5", "volume": None,
+                 "tradeTime": "20240103000000", "tradeTimeinMills": "1704240000000", "__typename": "PriceBar"},
+                {"open": "N/A", "high": "1", "low": "1", "close": "1", "volume": "5",
+                 "tradeTime": None, "tradeTimeinMills": None, "__typename": "PriceBar"},
+            ],
+            "allSymbols": [{"symbol": "NFLX", "name": "Netflix Inc"}],
+            "symbol": "NFLX",
+        },
+    },
+}
+
+@pytest.fixture
+def price_bars(tmp_path):
+    payload_file = tmp_path / "netflix_stock_data.json"
+    payload_file.write_text(json.dumps(PAYLOAD), encoding="utf-8")
+    metadata, price_bars = load_stock_data(payload_file)
+    assert metadata == {"timeRange": "5Y", "symbol": "NFLX", "name": "Netflix Inc"}
+    return metadata, clean_stock_data(price_bars)
+
+def test_columns_are_typed_with_per_column_nulls(price_bars):
+    _, bars = price_bars
+    assert bars["open"].tolist()[:2] == [100.5, 105.0] and bars["open"].isna().tolist() == [False, False, True]
+    assert bars["high"].isna().tolist() == [False, True, False]
+    assert str(bars["volume"].dtype) == "Int64" and bars["volume"].isna().tolist() == [False, True, False]
+    assert bars["tradeTimeinMills"].tolist()[:2] == [1704153600000, 1704240000000]
+    assert bars["tradeTimestamp"][0] == pd.Timestamp("2024-01-02", tz="UTC")
+    assert bars["tradeTimestamp"].isna().tolist() == [False, False, True]
+
+def test_table_and_json_products_load_the_same(price_bars, tmp_path):
+    metadata, bars = price_bars
+    table_file = tmp_path / "netflix_stock_data_cleaned.parquet"
+    json_file = tmp_path / "netflix_stock_data_cleaned.json"
+    save_cleaned_table(metadata, bars, table_file)
+    save_cleaned_data(metadata, bars, json_file)
+
+    assert read_metadata(table_file) == metadata
+    from_table = stock_price_rows(read_table(table_file), company_id=1)
+    from_json = stock_price_rows(pd.DataFrame(json.loads(json_file.read_text())["priceBars"]), company_id=1)
+    pd.testing.assert_frame_equal(from_table, from_json)
+    assert from_table.to_dict("records")[1] == {
+        "open": 105.0, "high": 0.0, "low": 101.0, "close": 103.5, "volume": 0,
+        "trade_time": "20240103000000", "trade_time_mills": 1704240000000, "company_id": 1,
+    }
+
+def test_rows_after_watermark_only(price_bars):
+    _, bars = price_bars
+    rows = stock_price_rows(bars, company_id=7, latest_trade_time_mills=1704153600000)
+    assert rows["trade_time_mills"].tolist() == [1704240000000]
+    assert rows["company_id"].tolist() == [7]
+    # Without a watermark every bar is kept, the one without a trade time as well
+    assert stock_price_rows(bars, company_id=7)["trade_time_mills"].tolist() == [1704153600000, 1704240000000, 0]
+    assert stock_price_rows(bars, company_id=7, latest_trade_time_mills=1704240000000).empty
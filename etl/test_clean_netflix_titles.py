@@ -0,0 +1,53 @@
+import json
+
+import pandas as pd
+import pytest
+import clean_netflix_titles as cleaner
+from clean_netflix_titles import clean_netflix_titles, load_netflix_titles
+
+ORIGINALS = [
+    {"title": "Stranger Things  ", "type": "TV", "titlereleased": "2016", "netflixid": "80057281",
+     "category": "Drama,Fantasy,Horror", "date_released": "2016-07-15", "image": "ignored"},
+    {"title": "Roma", "type": "Movie", "titlereleased": " ", "netflixid": "80240715",
+     "category": "Drama", "date_released": "2018-12-14"},
+    {"title": "Maniac", "type": "TV", "titlereleased": "Limited Series", "netflixid": "80124522",
+     "category": "Drama", "date_released": "2018-09-21"},
+    {"title": "Mindhunter", "type": "TV", "titlereleased": "2017-10-13", "netflixid": "80114855",
+     "category": "Crime,Thriller", "date_released": None},
+    {"title": "Special", "type": "Special", "netflixid": "81000000", "category": "Stand-up",
+     "date_released": "2020-01-01"},
+]
+
+CANCELLED_SHOWS = "Title\nMindhunter\nThe OA\n"
+
+@pytest.fixture
+def inputs(tmp_path):
+    originals_file = tmp_path / "netflix_originals.json"
+    cancelled_file = tmp_path / "netflix_cancelled_shows.csv"
+    originals_file.write_text(json.dumps(ORIGINALS, indent=2), encoding="utf-8")
+    cancelled_file.write_text(CANCELLED_SHOWS, encoding="utf-8")
+    return originals_file, cancelled_file
+
+def test_load_keeps_only_needed_columns(inputs):
+    originals_file, _ = inputs
+    df = load_netflix_titles(originals_file)
+    assert list(df.columns) == cleaner.COLUMNS_TO_KEEP
+    assert len(df) == 5
+    assert df["titlereleased"].isna().tolist() == [False, False, False, False, True]
+
+def test_clean_netflix_titles(inputs, tmp_path, monkeypatch):
+    monkeypatch.setattr(cleaner, "COLUMNAR", False)
+    originals_file, cancelled_file = inputs
+    cleaned_file = tmp_path / "netflix_originals_cleaned.json"
+
+    clean_netflix_titles(originals_file, cancelled_file, cleaned_file)
+
+    cleaned = pd.DataFrame(json.loads(cleaned_file.read_text(encoding="utf-8")))
+    assert cleaned["title"].tolist() == ["Stranger Things", "Roma", "Mindhunter", "Special"]
+    assert cleaned["type"].tolist() == ["tvSeries", "movie", "tvSeries", "Special"]
+    assert cleaned["titlereleased"].tolist() == ["2016", "2018", "2017", None]
+    assert cleaned["date_released"].tolist() == ["2016", "2018", None, "2020"]
+    assert cleaned["title_cleaned"].tolist() == ["strangerthings", "roma", "mindhunter", "special"]
+    assert cleaned["category"].tolist() == ["Drama,Sci-Fi/Fantasy,Horror", "Drama", "Thriller,Crime",
+                                            "Comedy,Stand-up Comedy"]
+    assert cleaned["cancelled"].tolist() == [False, False, True, False]
@@ -0,0 +1,104 @@
+import gzip
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+from download_utils import (GzipFileWriter, conditional_download, stream_gzip_to_file, write_gzip_response,
+                            write_json_response)
+from manifest import get_entry, product_unchanged
+
+PAYLOAD = b"tconst\ttitleType\tprimaryTitle\n" + b"tt0000001\tmovie\tSome title\n" * 5000
+
+class PayloadHandler(BaseHTTPRequestHandler):
+    body = gzip.compress(PAYLOAD)
+    etag = '"v1"'
+    requests_seen = []
+
+    def do_GET(self):
+        type(self).requests_seen.append(dict(self.headers))
+        if self.etag and self.headers.get("If-None-Match") == self.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        if self.etag:
+            self.send_header("ETag", self.etag)
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def server_url():
+    PayloadHandler.body = gzip.compress(PAYLOAD)
+    PayloadHandler.etag = '"v1"'
+    PayloadHandler.requests_seen = []
+    server = HTTPServer(("127.0.0.1", 0), PayloadHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/title.basics.tsv.gz"
+    server.shutdown()
+    server.server_close()
+
+def test_gzip_writer_handles_multiple_members(tmp_path):
+    data = gzip.compress(b"first\n") + gzip.compress(b"second\n")
+    writer = GzipFileWriter(tmp_path / "out.tsv")
+    for i in range(0, len(data), 7):
+        writer.write(data[i:i + 7])
+    stats = writer.close()
+    assert (tmp_path / "out.tsv").read_bytes() == b"first\nsecond\n"
+    assert stats["compressed_bytes"] == len(data)
+
+def test_stream_gzip_to_file(server_url, tmp_path):
+    extracted_file = tmp_path / "imdb_titles.tsv"
+    stats = stream_gzip_to_file(server_url, extracted_file, chunk_size=1024)
+    assert extracted_file.read_bytes() == PAYLOAD
+    assert stats["compressed_bytes"] == len(PayloadHandler.body)
+    assert stats["extracted_bytes"] == len(PAYLOAD)
+    assert stats["peak_rss"] > 0
+    assert list(tmp_path.iterdir()) == [extracted_file]
+
+def test_conditional_download_skips_on_304(server_url, tmp_path):
+    product = str(tmp_path / "imdb_titles.tsv")
+    manifest_path = str(tmp_path / "manifest.json")
+
+    assert conditional_download(server_url, product, write_gzip_response, manifest_path=manifest_path)
+    entry = get_entry(product, manifest_path)
+    assert entry["etag"] == '"v1"'
+    assert entry["size"] == len(PayloadHandler.body)
+    assert not product_unchanged(product, manifest_path)
+
+    assert not conditional_download(server_url, product, write_gzip_response, manifest_path=manifest_path)
+    assert PayloadHandler.requests_seen[-1]["If-None-Match"] == '"v1"'
+    assert product_unchanged(product, manifest_path)
+    assert open(product, "rb").read() == PAYLOAD
+
+def test_conditional_download_drops_validators_when_the_url_changes(server_url, tmp_path):
+    product = str(tmp_path / "netflix_stock_data.json")
+    manifest_path = str(tmp_path / "manifest.json")
+
+    assert conditional_download(server_url + "?range=max", product, write_gzip_response, manifest_path=manifest_path)
+    PayloadHandler.body = gzip.compress(PAYLOAD + b"tt0000002\tmovie\tNewer title\n")
+    assert conditional_download(server_url + "?range=3M", product, write_gzip_response, manifest_path=manifest_path)
+    assert "If-None-Match" not in PayloadHandler.requests_seen[-1]
+    assert get_entry(product, manifest_path)["url"] == server_url + "?range=3M"
+
+    assert not conditional_download(server_url + "?range=3M", product, write_gzip_response, manifest_path=manifest_path)
+    assert PayloadHandler.requests_seen[-1]["If-None-Match"] == '"v1"'
+
+def test_conditional_download_skips_write_on_same_hash(server_url, tmp_path):
+    PayloadHandler.etag = None
+    PayloadHandler.body = b'{"data": [1, 2, 3]}'
+    product = str(tmp_path / "netflix_originals.json")
+    manifest_path = str(tmp_path / "manifest.json")
+
+    assert conditional_download(server_url, product, write_json_response, manifest_path=manifest_path)
+    assert not conditional_download(server_url, product, write_json_response, manifest_path=manifest_path)
+    assert product_unchanged(product, manifest_path)
+    assert not (tmp_path / "netflix_originals.json.part").exists()
+
+    PayloadHandler.body = b'{"data": [1, 2, 3, 4]}'
+    assert conditional_download(server_url, product, write_json_response, manifest_path=manifest_path)
+    assert not product_unchanged(product, manifest_path)
@@ -0,0 +1,24 @@
+import pandas as pd
+from genres import normalize_genre, normalize_genres
+
+def test_normalize_genre_is_deterministic():
+    assert normalize_genre("Horror,Drama,Fantasy") == "Drama,Sci-Fi/Fantasy,Horror"
+    assert normalize_genre("Stand-up") == "Comedy,Stand-up Comedy"
+    assert normalize_genre("Western") == "Other"
+    assert normalize_genre("") == "Other"
+
+def test_normalize_genres_matches_per_value():
+    genres = pd.Series(
+        ["Drama", "Comedy, Romance", "Horror,Drama,Fantasy", "Making-of", "\\N", "", None, "Drama", "Dramas,Drama"],
+        index=[10, 11, 12, 13, 14, 15, 16, 17, 18],
+        name="genres",
+    )
+    normalized = normalize_genres(genres)
+    assert normalized.index.equals(genres.index)
+    assert normalized.name == "genres"
+    assert list(normalized) == [normalize_genre(genre) for genre in genres]
+    assert normalized[13] == "Documentary,Specials"
+    assert normalized[18] == "Drama"
+
+def test_normalize_genres_empty_column():
+    assert normalize_genres(pd.Series([], dtype=object)).empty
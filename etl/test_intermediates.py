@@ -0,0 +1,55 @@
+import pandas as pd
+from intermediates import (NETFLIX_ORIGINALS_SCHEMA, STOCK_PRICES_SCHEMA, TableWriter, iter_batches, read_metadata,
+                           read_table, row_group_count, write_table)
+
+def test_netflix_originals_round_trip(tmp_path):
+    file_path = tmp_path / "netflix_originals_cleaned.parquet"
+    df = pd.DataFrame({
+        "title": ["Dark", "Roma"],
+        "type": ["tvSeries", "movie"],
+        "titlereleased": ["2017", ""],
+        "netflixid": ["80100172", 80240715],
+        "category": ["Drama,Sci-Fi/Fantasy", "Drama"],
+        "date_released": ["2017", None],
+        "title_cleaned": ["dark", "roma"],
+        "cancelled": [False, True],
+        "ignored": [1, 2],
+    })
+    write_table(df, NETFLIX_ORIGINALS_SCHEMA, file_path)
+
+    loaded = read_table(file_path)
+    assert list(loaded.columns) == NETFLIX_ORIGINALS_SCHEMA.names
+    assert loaded["titlereleased"].tolist() == [2017, pd.NA]
+    assert loaded["netflixid"].tolist() == [80100172, 80240715]
+    assert loaded["cancelled"].tolist() == [False, True]
+    assert read_table(file_path, columns=["title_cleaned"]).columns.tolist() == ["title_cleaned"]
+
+def test_stock_prices_keep_metadata(tmp_path):
+    file_path = tmp_path / "netflix_stock_data_cleaned.parquet"
+    price_bars = pd.DataFrame([
+        {"open": "1.5", "high": 2, "low": 1, "close": None, "volume": "100",
+         "tradeTime": "20240102000000", "tradeTimeinMills": "1704153600000",
+         "tradeTimestamp": pd.Timestamp(1704153600000, unit="ms", tz="UTC")},
+    ] * 5)
+    write_table(price_bars, STOCK_PRICES_SCHEMA, file_path, metadata={"symbol": "NFLX", "name": "Netflix Inc"})
+
+    assert read_metadata(file_path) == {"symbol": "NFLX", "name": "Netflix Inc"}
+    batches = list(iter_batches(file_path, columns=["close", "tradeTimeinMills"], batch_size=2))
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert batches[0]["close"].isna().all()
+    assert batches[0]["tradeTimeinMills"].tolist() == [1704153600000] * 2
+    assert read_table(file_path, columns=["tradeTimestamp"])["tradeTimestamp"][0] == pd.Timestamp("2024-01-02", tz="UTC")
+
+def test_table_writer_row_groups_and_footer_metadata(tmp_path):
+    file_path = tmp_path / "netflix_stock_data_cleaned.parquet"
+    writer = TableWriter(file_path, STOCK_PRICES_SCHEMA)
+    for day in range(3):
+        writer.write(pd.DataFrame([{"open": day, "high": day, "low": day, "close": day, "volume": day,
+                                    "tradeTime": str(day), "tradeTimeinMills": day, "tradeTimestamp": None}] * 2))
+    writer.close({"symbol": "NFLX"})
+
+    assert read_metadata(file_path) == {"symbol": "NFLX"}
+    assert row_group_count(file_path) == 3
+    volumes = pd.concat(iter_batches(file_path, columns=["volume"], row_groups=[0, 2]))["volume"]
+    assert volumes.tolist() == [0, 0, 2, 2]
+    assert list(iter_batches(file_path, row_groups=[])) == []
@@ -0,0 +1,81 @@
+import io
+import json
+
+import pytest
+from json_stream import JsonStreamReader, iter_json_array, iter_json_path
+
+ITEMS = [
+    {"title": "Dark", "netflixid": "80100172", "nested": {"seasons": [1, 2, 3]}},
+    {"title": "Amélie \"quoted\", [brackets]", "netflixid": 12345678901234},
+    1234567,
+    -0.5e10,
+    None,
+    "plain string",
+    [],
+]
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 1 << 16])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_items_match_json_load(tmp_path, chunk_size, indent):
+    file_path = tmp_path / "items.json"
+    file_path.write_text(json.dumps(ITEMS, indent=indent, ensure_ascii=False), encoding="utf-8")
+    assert list(iter_json_array(file_path, chunk_size=chunk_size)) == ITEMS
+
+def test_empty_array(tmp_path):
+    file_path = tmp_path / "empty.json"
+    file_path.write_text(" [ ]\n", encoding="utf-8")
+    assert list(iter_json_array(file_path, chunk_size=1)) == []
+
+@pytest.mark.parametrize("document", ['{"items": []}', '[1, 2', '[1 2]', '[{"title": "cut'])
+def test_malformed_documents_raise(tmp_path, document):
+    file_path = tmp_path / "broken.json"
+    file_path.write_text(document, encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(iter_json_array(file_path, chunk_size=2))
+
+PAYLOAD = {
+    "data": {
+        "chartData": {
+            "timeRange": "5Y",
+            "priceBars": [{"open": "1.5", "tradeTimeinMills": "1704153600000"}, {"open": None}],
+            "allSymbols": [{"symbol": "NFLX", "name": "Netflix Inc"}],
+            "symbol": "NFLX",
+        },
+        "extra": {"priceBars": ["not", "these"]},
+    },
+}
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 1 << 16])
+def test_path_items_and_siblings(tmp_path, chunk_size):
+    file_path = tmp_path / "payload.json"
+    file_path.write_text(json.dumps(PAYLOAD, indent=2), encoding="utf-8")
+    siblings = {}
+    items = list(iter_json_path(file_path, ("data", "chartData", "priceBars"), siblings, chunk_size=chunk_size))
+    chart_data = PAYLOAD["data"]["chartData"]
+    assert items == chart_data["priceBars"]
+    assert siblings == {key: value for key, value in chart_data.items() if key != "priceBars"}
+
+def test_missing_path_raises(tmp_path):
+    file_path = tmp_path / "payload.json"
+    file_path.write_text(json.dumps({"data": {"chartData": None}}), encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(iter_json_path(file_path, ("data", "chartData", "priceBars")))
+
+class CountingDecoder(json.JSONDecoder):
+    calls = 0
+
+    def raw_decode(self, s, idx=0):
+        type(self).calls += 1
+        return super().raw_decode(s, idx)
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 16])
+def test_values_spanning_chunks_are_decoded_once_complete(chunk_size):
+    # Escaped quotes and backslashes land on every chunk boundary for the small chunk sizes
+    large = {"description": 'a \\"quoted\\" \\\\ {[' * 200, "cast": [{"name": f"Actor {i}"} for i in range(200)]}
+    items = [large, "x" * 5000, 7]
+    reader = JsonStreamReader(io.StringIO(json.dumps(items)), chunk_size)
+    reader.decoder = CountingDecoder()
+    CountingDecoder.calls = 0
+    assert list(reader.items()) == items
+    # Not one decode per chunk: a cut off value is decoded again once it is complete
+    assert CountingDecoder.calls <= 3 * len(items)
@@ -0,0 +1,150 @@
+import pandas as pd
+import pytest
+import load_database
+from intermediates import IMDB_TITLES_SCHEMA, TableWriter
+from load_database import (build_netflix_index, category_links, collect_title_keys, copy_movies, match_netflix,
+                           movie_rows, read_imdb_genre_names, read_imdb_titles_share, unmatched_movie_rows,
+                           unmatched_titles)
+
+NETFLIX_ORIGINALS = pd.DataFrame({
+    "title_cleaned": ["strangerthings", "roma", "roma", "dark", "mindhunter"],
+    "titlereleased": ["2016", "2018", "2018", None, pd.NA],
+    "type": ["tvSeries", "movie", "movie", "tvSeries", "tvSeries"],
+    "netflixid": ["80057281", "80240715", "99999999", "80100172", "80114855"],
+    "cancelled": [False, True, False, False, True],
+})
+
+def per_row_scan(chunk, netflix_originals):
+    # Old load_imdb_data matching, with the years compared as numbers on both sides
+    years = pd.to_numeric(netflix_originals["titlereleased"], errors="coerce")
+    matches = []
+    for _, row in chunk.iterrows():
+        matching = netflix_originals[(netflix_originals["title_cleaned"] == row["primaryTitle_cleaned"])
+                                     & (years == row["startYear"]) & (netflix_originals["type"] == row["titleType"])]
+        matches.append((int(matching.iloc[0]["netflixid"]), bool(matching.iloc[0]["cancelled"]))
+                       if not matching.empty else (None, False))
+    return matches
+
+def test_match_netflix_resolves_a_whole_chunk():
+    chunk = pd.DataFrame({
+        "primaryTitle_cleaned": ["roma", "strangerthings", "strangerthings", "dark", "unknown", "roma"],
+        "startYear": pd.array([2018, 2016, 2017, 2017, 2020, 2018], dtype="Int16"),
+        "titleType": pd.Categorical(["movie", "tvSeries", "tvSeries", "tvSeries", "movie", "tvSeries"]),
+    }, index=[40, 41, 42, 43, 44, 45])
+
+    netflix_id, cancelled = match_netflix(chunk, build_netflix_index(NETFLIX_ORIGINALS))
+
+    assert netflix_id.index.equals(chunk.index) and cancelled.index.equals(chunk.index)
+    netflix_id = [None if pd.isna(value) else value for value in netflix_id]
+    assert netflix_id == [80240715, 80057281, None, None, None, None]
+    assert cancelled.tolist() == [True, False, False, False, False, False]
+    assert list(zip(netflix_id, cancelled)) == per_row_scan(chunk, NETFLIX_ORIGINALS)
+
+def test_year_dtypes_are_aligned():
+    # A CSV product gives int64 years and the Netflix side strings, they still have to match
+    chunk = pd.DataFrame({"primaryTitle_cleaned": ["roma"], "startYear": [2018], "titleType": ["movie"]})
+    netflix_id, _ = match_netflix(chunk, build_netflix_index(NETFLIX_ORIGINALS))
+    assert netflix_id.tolist() == [80240715]
+
+class FakeCursor:
+    """Hands out ids like a serial sequence and keeps what would have been copied, per table."""
+
+    def __init__(self):
+        self.next_ids = {}
+        self.copied = {}
+        self.result = []
+
+    def execute(self, query, params):
+        table, count = params
+        start = self.next_ids.get(table, 1)
+        self.next_ids[table] = start + count
+        self.result = [(next_id,) for next_id in range(start, start + count)]
+
+    def fetchall(self):
+        return self.result
+
+    def copy_expert(self, query, buffer):
+        table = query.split()[1]
+        self.copied.setdefault(table, []).extend(buffer.read().splitlines())
+
+def test_copy_movies_links_categories_by_reserved_ids():
+    chunk = pd.DataFrame({
+        "tconst": ["tt6155172", "tt4574334"],
+        "primaryTitle": ["Roma ", "Stranger Things"],
+        "titleType": pd.Categorical(["movie", "tvSeries"]),
+        "startYear": pd.array([2018, 2016], dtype="Int16"),
+        "runtimeMinutes": pd.array([135, None], dtype="Int32"),
+        "averageRating": [7.7, 8.7],
+        "genres": ["Drama", "Drama,Sci-Fi/Fantasy,Horror"],
+        "primaryTitle_cleaned": ["roma", "strangerthings"],
+    })
+    cursor = FakeCursor()
+    category_mapping = {"Drama": 50}
+
+    rows_written = copy_movies(cursor, movie_rows(chunk, build_netflix_index(NETFLIX_ORIGINALS)), category_mapping)
+
+    assert cursor.copied["movies"] == [
+        "tt6155172,Roma,movie,2018,135,7.7,80240715,True,1",
+        "tt4574334,Stranger Things,tvSeries,2016,\\N,8.7,80057281,False,2",
+    ]
+    assert category_mapping == {"Drama": 50, "Sci-Fi/Fantasy": 1, "Horror": 2}
+    assert cursor.copied["categories"] == ["1,Sci-Fi/Fantasy", "2,Horror"]
+    assert cursor.copied["movie_categories"] == ["1,50", "2,50", "2,1", "2,2"]
+    assert rows_written == 2 + 2 + 4
+
+def test_category_links_skip_blank_and_repeated_genres():
+    links = category_links(pd.Series([1, 2, 3]), pd.Series(["Drama, Drama", "", None]))
+    assert links.values.tolist() == [[1, "Drama"]]
+
+def test_unmatched_titles_from_collected_keys():
+    netflix_originals = NETFLIX_ORIGINALS.assign(title=NETFLIX_ORIGINALS["title_cleaned"])
+    title_keys = set()
+    for chunk in [pd.DataFrame({"primaryTitle_cleaned": ["strangerthings", "inception"]}),
+                  pd.DataFrame({"primaryTitle_cleaned": ["roma", None]})]:
+        collect_title_keys(title_keys, chunk, netflix_originals)
+    assert title_keys == {"strangerthings", "roma"}
+    assert list(unmatched_titles(netflix_originals, title_keys)["title"]) == ["dark", "mindhunter"]
+
+def test_unmatched_titles_keep_one_row_per_netflix_id():
+    netflix_originals = NETFLIX_ORIGINALS.assign(
+        title=NETFLIX_ORIGINALS["title_cleaned"], category="Drama",
+        netflixid=["80057281", "80100172", None, "80100172", "80114855"])
+
+    missing_titles = unmatched_titles(netflix_originals, {"strangerthings"})
+
+    # The title without an id could never be matched again by an incremental load
+    assert list(missing_titles["title"]) == ["roma", "mindhunter"]
+    rows = unmatched_movie_rows(missing_titles)
+    assert rows["netflix_id"].tolist() == [80100172, 80114855]
+
+@pytest.fixture
+def imdb_titles_file(tmp_path, monkeypatch):
+    file_path = str(tmp_path / "imdb_titles_cleaned.parquet")
+    monkeypatch.setattr(load_database, "COLUMNAR", True)
+    monkeypatch.setattr(load_database, "imdb_titles_file_path", file_path)
+    writer = TableWriter(file_path, IMDB_TITLES_SCHEMA)
+    for row_group in range(5):
+        writer.write(pd.DataFrame({
+            "tconst": [f"tt{row_group}{row}" for row in range(3)], "titleType": "movie", "primaryTitle": "Title",
+            "startYear": 2000, "runtimeMinutes": 90, "genres": ["Drama", "Drama,Comedy", "Other"][row_group % 3],
+            "primaryTitle_cleaned": "title", "averageRating": 7.0,
+        }))
+    return writer, file_path
+
+def test_worker_shares_split_the_row_groups(imdb_titles_file):
+    writer, _ = imdb_titles_file
+    writer.close()
+
+    shares = [pd.concat(read_imdb_titles_share(worker, 2))["tconst"].tolist() for worker in range(2)]
+
+    assert [len(share) for share in shares] == [9, 6]
+    assert sorted(shares[0] + shares[1]) == sorted(pd.concat(load_database.read_imdb_titles())["tconst"])
+    assert list(read_imdb_titles_share(3, 4)) != [] and list(read_imdb_titles_share(5, 6)) == []
+
+def test_genre_names_from_metadata_or_column(imdb_titles_file):
+    writer, file_path = imdb_titles_file
+    writer.close()
+    assert sorted(read_imdb_genre_names()) == ["Comedy", "Drama", "Other"]
+
+    TableWriter(file_path, IMDB_TITLES_SCHEMA).close({"genres": '["Drama", "Horror"]'})
+    assert read_imdb_genre_names() == ["Drama", "Horror"]
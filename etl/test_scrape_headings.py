@@ -1,6 +1,7 @@
 import pytest
-from unittest.mock import patch, mock_open
-from scrape_headings import fetch_page, parse_headings, save_headings_to_csv
+from unittest.mock import MagicMock, patch, mock_open
+from scrape_headings import (fetch_page, fetch_page_cached, parse_headings, parse_page_links, save_headings_to_csv,
+                             scrape_all_headings)
 
 @patch('scrape_headings.requests.get')
 def test_fetch_page_success(mock_get):
@@ -33,4 +34,54 @@ def test_save_headings_to_csv(mock_csv_writer, mock_open):
     mock_open.assert_called_once_with("test.csv", 'w', newline='', encoding='utf-8')
     mock_csv_writer().writerow.assert_any_call(["Title"])
     mock_csv_writer().writerow.assert_any_call(["Heading 1"])
-    mock_csv_writer().writerow.assert_any_call(["Heading 2"])
\ No newline at end of file
+    mock_csv_writer().writerow.assert_any_call(["Heading 2"])
+
+def test_parse_headings_matches_multi_class_headings():
+    html_content = b"""
+    <html>
+        <h2 class="entry article-list__heading">'Heading 1'</h2>
+        <div class="article-list__heading-image">Not a heading</div>
+    </html>
+    """
+    assert parse_headings(html_content) == ["Heading 1"]
+
+def test_parse_page_links():
+    list_url = "https://example.com/list/shows/"
+    html_content = b"""
+    <html>
+        <link rel="canonical" href="https://example.com/list/shows/">
+        <a href="/list/shows/page/2/">2</a>
+        <a rel="next" href="/list/shows/page/2/">Next</a>
+        <a href="/list/other/page/2/">Other list</a>
+    </html>
+    """
+    assert parse_page_links(html_content, list_url, list_url) == ["https://example.com/list/shows/page/2/"]
+
+@patch('scrape_headings.requests.get')
+def test_fetch_page_cached_revalidates(mock_get, tmp_path):
+    mock_get.return_value.status_code = 200
+    mock_get.return_value.content = b"<html>v1</html>"
+    mock_get.return_value.headers = {"ETag": '"v1"'}
+    assert fetch_page_cached("http://example.com", {}, tmp_path) == b"<html>v1</html>"
+
+    mock_get.return_value.status_code = 304
+    mock_get.return_value.content = b""
+    assert fetch_page_cached("http://example.com", {}, tmp_path) == b"<html>v1</html>"
+    assert mock_get.call_args.kwargs["headers"]["If-None-Match"] == '"v1"'
+
+@patch('scrape_headings.requests.get')
+def test_scrape_all_headings_follows_pages(mock_get, tmp_path):
+    pages = {
+        "http://example.com/list/": b"""<div class="article-list__heading">Show 1</div>
+            <a href="/list/page/2/">2</a><a href="/list/page/3/">3</a>""",
+        "http://example.com/list/page/2/": b"""<div class="article-list__heading">Show 2</div>
+            <div class="article-list__heading">Show 1</div>""",
+        "http://example.com/list/page/3/": b"""<div class="article-list__heading">Show 3</div>""",
+    }
+
+    def get(url, headers):
+        return MagicMock(status_code=200, content=pages[url], headers={})
+
+    mock_get.side_effect = get
+    headings = scrape_all_headings("http://example.com/list/", {}, cache_dir=tmp_path, max_workers=2)
+    assert headings == ["Show 1", "Show 2", "Show 3"]
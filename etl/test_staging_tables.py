@@ -0,0 +1,14 @@
+from staging_tables import referencing_staging, staging_name
+
+
+def test_staging_name():
+    assert staging_name("movies") == "movies_staging"
+
+def test_foreign_keys_reference_staging_tables():
+    definition = "FOREIGN KEY (movie_id) REFERENCES movies(id)"
+    assert referencing_staging(definition, ["categories", "movies"]) == \
+        "FOREIGN KEY (movie_id) REFERENCES movies_staging(id)"
+
+def test_foreign_keys_outside_the_swap_are_kept():
+    definition = "FOREIGN KEY (company_id) REFERENCES companies(id)"
+    assert referencing_staging(definition, ["movies"]) == definition
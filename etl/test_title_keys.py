@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+from title_keys import normalize_and_clean_title, normalize_titles
+
+def test_normalize_and_clean_title():
+    assert normalize_and_clean_title("Amélie: The Series") == "amelie"
+    assert normalize_and_clean_title("Money Heist (La casa de papel) ") == "moneyheistlacasadepapel"
+    assert normalize_and_clean_title("The Movie") == ""
+    assert normalize_and_clean_title(None) == ""
+    assert normalize_and_clean_title(1899) == ""
+
+def test_normalize_titles_matches_per_value():
+    titles = pd.Series(
+        ["Amélie: The Series", "Stranger Things", None, np.nan, 1899, "Stranger Things", "Narcos: México", "  "],
+        index=range(100, 108),
+        name="title",
+    )
+    keys = normalize_titles(titles)
+    assert keys.index.equals(titles.index)
+    assert keys.name == "title"
+    assert list(keys) == [normalize_and_clean_title(title) for title in titles]
+
+def test_normalize_titles_without_strings():
+    assert list(normalize_titles(pd.Series([1, 2]))) == ["", ""]
+    assert normalize_titles(pd.Series([], dtype=object)).empty
@@ -0,0 +1,39 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+import pandas as pd
+
+NON_WORD_PATTERN = r'[^\w]'
+DROPPED_SUFFIXES = ["theseries", "themovie"]
+
+
+@lru_cache(maxsize=100_000)
+def _title_key(title):
+    title = unicodedata.normalize('NFD', title).encode('ascii', 'ignore').decode('ascii')
+    title = title.lower()
+    title = re.sub(NON_WORD_PATTERN, '', title)
+    title = title.strip()
+    for suffix in DROPPED_SUFFIXES:
+        title = title.replace(suffix, "")
+    return title
+
+def normalize_and_clean_title(title):
+    """Join key of one title: accents folded to ASCII, lower case, only word characters left."""
+    if not isinstance(title, str):
+        return ""
+    return _title_key(title)
+
+def normalize_titles(titles):
+    """Vectorized normalize_and_clean_title, computed once per distinct title of the column."""
+    codes, uniques = pd.factorize(titles)
+    keys = pd.Series(uniques, dtype=object)
+    is_str = keys.map(lambda title: isinstance(title, str))
+    keys = keys.where(is_str).str.normalize('NFD').str.encode('ascii', 'ignore').str.decode('ascii')
+    keys = keys.str.lower().str.replace(NON_WORD_PATTERN, '', regex=True).str.strip()
+    for suffix in DROPPED_SUFFIXES:
+        keys = keys.str.replace(suffix, '', regex=False)
+
+    # factorize marks missing titles with -1, they get the same "" key as non-strings
+    keys = pd.concat([keys.fillna(""), pd.Series([""])], ignore_index=True)
+    return pd.Series(keys.to_numpy()[codes], index=titles.index, name=titles.name, dtype=object)
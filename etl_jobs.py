@@ -0,0 +1,146 @@
+import fcntl
+import json
+import os
+import subprocess
+import sys
+import time
+
+# The "Load data from database" button runs the ploomber pipeline in a detached process, request threads only
+# start it and read its progress. The process holds LOCK_PATH for the whole build, so there is never more than
+# one rebuild whichever gunicorn worker the click lands on. Progress is an append-only log of JSON events,
+# written by the job and by the task hooks, which may run in ploomber's own subprocesses.
+PIPELINE_PATH = "etl/pipeline.yaml"
+JOB_DIR = ".cache"
+LOCK_PATH = os.path.join(JOB_DIR, "etl_job.lock")
+EVENTS_PATH = os.path.join(JOB_DIR, "etl_job.events")
+LOG_PATH = os.path.join(JOB_DIR, "etl_job.log")
+# Status polls probe the lock shared for an instant, a click waits this long for them to let go
+START_TIMEOUT_SECONDS = 1.0
+START_RETRY_SECONDS = 0.01
+
+
+def record(event, **fields):
+    line = json.dumps({"event": event, "time": time.time(), **fields}) + "\n"
+    # One short write on an O_APPEND descriptor, lines of concurrent writers do not interleave
+    fd = os.open(EVENTS_PATH, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line.encode())
+    finally:
+        os.close(fd)
+
+def open_lock():
+    os.makedirs(JOB_DIR, exist_ok=True)
+    return os.open(LOCK_PATH, os.O_RDWR | os.O_CREAT, 0o644)
+
+def is_running():
+    # Shared, so concurrent polls never fail each other, only the job's exclusive lock makes the probe fail
+    fd = open_lock()
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return True
+    finally:
+        os.close(fd)
+    return False
+
+def lock_exclusive(fd):
+    """Take the exclusive lock, retrying past status probes. False when it is still held after START_TIMEOUT_SECONDS."""
+    deadline = time.monotonic() + START_TIMEOUT_SECONDS
+    while True:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(START_RETRY_SECONDS)
+
+def start_job():
+    """Start a rebuild unless one is running, returns False when the click joined the running one."""
+    fd = open_lock()
+    try:
+        if not lock_exclusive(fd):
+            return False
+        with open(EVENTS_PATH, "w"):
+            pass
+        record("queued")
+        # The job inherits the locked descriptor, the lock is released when the job exits however it ends
+        with open(LOG_PATH, "w") as log:
+            subprocess.Popen([sys.executable, "-m", "etl_jobs"], pass_fds=(fd,), stdin=subprocess.DEVNULL,
+                             stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+        return True
+    finally:
+        os.close(fd)
+
+def task_finished(task):
+    record("task_finished", task=task.name)
+
+def task_failed(task):
+    record("task_failed", task=task.name)
+
+def run_job():
+    from ploomber.spec import DAGSpec
+
+    dag = DAGSpec(PIPELINE_PATH).to_dag()
+    for name in dag:
+        dag[name].on_finish = task_finished
+        dag[name].on_failure = task_failed
+    # Iterating a DAG yields its tasks in topological order, the order the serial executor runs them in
+    record("started", tasks=list(dag))
+    try:
+        dag.build(force=True)
+    except Exception as e:
+        record("failed", error=str(e))
+        raise
+    record("finished")
+
+def read_events():
+    try:
+        with open(EVENTS_PATH) as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+def job_status():
+    """State of the last rebuild with every task's status and duration in seconds, for the page to poll."""
+    # Lock first: a job that ends in between has written its last event by the time the events are read
+    running = is_running()
+    events = read_events()
+    if not events:
+        return {"state": "idle", "tasks": [], "done": 0, "elapsed": None, "error": None}
+    last = events[-1]["event"]
+    if last in ("finished", "failed"):
+        state = "succeeded" if last == "finished" else "failed"
+    else:
+        # A job that died without its last event no longer holds the lock
+        state = "running" if running else "failed"
+
+    names = next((event["tasks"] for event in events if event["event"] == "started"), [])
+    tasks = {name: {"name": name, "status": "pending", "duration": None} for name in names}
+    # The serial executor runs one task at a time, each one started when the previous one ended
+    previous_time = events[0]["time"]
+    for event in events:
+        if event["event"] == "started":
+            previous_time = event["time"]
+        elif event["event"] in ("task_finished", "task_failed") and event["task"] in tasks:
+            tasks[event["task"]].update(status="finished" if event["event"] == "task_finished" else "failed",
+                                        duration=event["time"] - previous_time)
+            previous_time = event["time"]
+    pending = [task for task in tasks.values() if task["status"] == "pending"]
+    if state == "running" and pending:
+        pending[0].update(status="running", duration=time.time() - previous_time)
+
+    finished_time = events[-1]["time"] if state != "running" else time.time()
+    return {
+        "state": state,
+        "tasks": list(tasks.values()),
+        "done": sum(task["status"] == "finished" for task in tasks.values()),
+        "elapsed": finished_time - events[0]["time"],
+        "error": next((event["error"] for event in events if event["event"] == "failed"),
+                      "Interrupted, see " + LOG_PATH if state == "failed" else None),
+    }
+
+if __name__ == "__main__":
+    # Through the module name, the task hooks then pickle as etl_jobs.* for ploomber's task subprocesses
+    import etl_jobs
+    etl_jobs.run_job()
@@ -0,0 +1,70 @@
+import sys
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from database import DATABASE_URL
+from pages import queries
+
+# Dashboard queries with the arguments of their most selective view and the indexes its plan should read.
+# The unfiltered "all titles" views aggregate most of movies, a sequential scan is the right plan for them.
+# The genre charts read the small genre_rollup table and are not listed.
+# On small tables (five years of daily NFLX bars) the planner may still prefer a scan, an index only fails the
+# check when it is not used even with sequential scans disabled.
+DASHBOARD_QUERIES = [
+    (queries.get_rating_histogram, (True, "movies"), {"ix_movies_netflix_type_rating"}),
+    (queries.get_rating_histogram, (False, "tv-shows"), {"ix_movies_type_rating"}),
+    (queries.get_stock_prices, ("NFLX",), {"ix_stock_prices_company_trade_time"}),
+    (queries.get_netflix_stock_prices, (), {"ix_stock_prices_company_trade_time"}),
+    (queries.get_netflix_releases, (), {"ix_movies_netflix_released_rating"}),
+]
+
+
+def plan_indexes(plan):
+    """Names of all indexes read anywhere in an EXPLAIN (FORMAT JSON) plan node."""
+    indexes = {plan["Index Name"]} if "Index Name" in plan else set()
+    for child in plan.get("Plans", []):
+        indexes |= plan_indexes(child)
+    return indexes
+
+def explain_query(engine, query, arguments, seqscan=True):
+    """Run the dashboard query, then EXPLAIN the statements it sent. Returns the plans and the indexes they read."""
+    statements = []
+
+    def record(connection, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        with sessionmaker(bind=engine)() as session:
+            # Past the result cache, the statements are what is being checked
+            getattr(query, "__wrapped__", query)(session, *arguments)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    plans = []
+    with engine.connect() as connection:
+        if not seqscan:
+            connection.exec_driver_sql("SET enable_seqscan = off")
+        for statement, parameters in statements:
+            plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+            plans.append(plan[0]["Plan"])
+    return plans, set().union(*map(plan_indexes, plans))
+
+def main(database_url=DATABASE_URL):
+    engine = create_engine(database_url)
+    failures = 0
+    for query, arguments, expected in DASHBOARD_QUERIES:
+        _, used = explain_query(engine, query, arguments)
+        missing = expected - used
+        status = "ok"
+        if missing:
+            _, usable = explain_query(engine, query, arguments, seqscan=False)
+            missing -= usable
+            failures += bool(missing)
+            status = f"MISSING {', '.join(sorted(missing))}" if missing else "ok, scan preferred on this data"
+        print(f"{query.__name__}{arguments}: {status} (reads {', '.join(sorted(used)) or 'no index'})")
+    return failures
+
+if __name__ == "__main__":
+    sys.exit(1 if main(*sys.argv[1:]) else 0)
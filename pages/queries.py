@@ -1,124 +1,135 @@
 
 
 import pandas as pd
-from sqlalchemy import desc, func
-from db_schema import Category, Company, Movie, StockPrice, movie_categories
+from sqlalchemy import Float, and_, cast, func, true, tuple_
+from db_schema import Company, GenreRollup, Movie, StockPrice
+from query_cache import cached_query
 
-def apply_selected_tab_filter(query, selected_tab):
+# Results are cached per arguments until load_database stamps a new data version, see query_cache.
+# The genre charts are answered from genre_rollup, which load_database rebuilds after every load.
+# Averages are the summed values over the summed counts, so they match AVG over the movies themselves.
+
+def apply_selected_tab_filter(query, selected_tab, type_column=Movie.type):
     if selected_tab == "movies":
-        query = query.filter(Movie.type == "movie")
+        query = query.filter(type_column == "movie")
     elif selected_tab == "tv-shows":
-        query = query.filter(Movie.type == "tvSeries")
+        query = query.filter(type_column == "tvSeries")
     return query
 
-def get_movie_avg_rating_by_category(session, show_only_netflix, selected_tab):
-    query = session.query(
-            Category.name,
-            func.avg(Movie.imdb_rating).label("avg_rating")
-        ).join(movie_categories, movie_categories.c.category_id == Category.id)\
-        .join(Movie, Movie.id == movie_categories.c.movie_id)\
-        .filter(Movie.imdb_rating.isnot(None))\
-        .filter(Movie.netflix_id.isnot(None) if show_only_netflix else True)
-    
-    query = apply_selected_tab_filter(query, selected_tab)
-
-    result = query.group_by(Category.name)\
-                  .order_by(desc("avg_rating"))\
-                  .all()
-
-    return pd.DataFrame(result, columns=["Genre", "Average IMDb Rating"])
-
-def get_trending_genres_over_time(session, show_only_netflix, selected_tab):
-    query = session.query(
-        Movie.released_year,
-        Category.name,
-        func.count(Movie.id).label("movie_count")
-    ).filter(
-        Movie.netflix_id.isnot(None) if show_only_netflix else True).join(
-        movie_categories, movie_categories.c.movie_id == Movie.id
-    ).join(
-        Category, Category.id == movie_categories.c.category_id
-    )
-
-    query = apply_selected_tab_filter(query, selected_tab)
-
-    result = query.group_by(
-        Movie.released_year,
-        Category.name
-    ).order_by(
-        Movie.released_year,
-        func.count(Movie.id).desc()
-    ).all()
-
-    data = [{
-        "year": item.released_year,
-        "category": item.name,
-        "movie_count": item.movie_count
-    } for item in result]
-
-    df = pd.DataFrame(data)
-    return df
-
-def get_categories_by_runtime(session, show_only_netflix, selected_tab):
-    query = session.query(
-        Category.name,
-        func.avg(Movie.runtime_minutes).label("avg_runtime")
-    ).join(movie_categories, movie_categories.c.category_id == Category.id)\
-        .join(Movie, movie_categories.c.movie_id == Movie.id)\
-        .filter(Movie.runtime_minutes.isnot(None))\
-        .filter(Movie.netflix_id.isnot(None) if show_only_netflix else True)
-    
-    query = apply_selected_tab_filter(query, selected_tab)
-
-    result = query.group_by(Category.name)\
-                  .order_by(desc("avg_runtime"))\
-                  .all()
-
-    return pd.DataFrame(result, columns=["Genre", "Average Runtime (Minutes)"])
-
-def get_genre_distribution(session, show_only_netflix, selected_tab):
-    query = session.query(
-        Category.name,
-        func.count(Movie.id).label("movie_count")
-    ).join(movie_categories, movie_categories.c.category_id == Category.id)\
-        .join(Movie, movie_categories.c.movie_id == Movie.id)\
+# IMDb ratings run from 1 to 10, the histogram has fixed half-point bins over 0-10
+RATING_RANGE = (0, 10)
+RATING_BINS = 20
+
+def rating_bin(rating):
+    """Number of the RATING_BINS bin a rating falls in, from 1, each bin includes its start."""
+    low, high = RATING_RANGE
+    # width_bucket puts the top edge (10.0) in an overflow bucket of its own, it belongs to the last bin
+    return func.least(func.width_bucket(rating, low, high, RATING_BINS), RATING_BINS)
+
+@cached_query
+def get_rating_histogram(session, show_only_netflix, selected_tab):
+    """Rated titles per rating bin, counted in the database: one row per bin whatever the catalog size."""
+    bucket = rating_bin(Movie.imdb_rating).label("bucket")
+    query = session.query(bucket, func.count().label("count")).filter(Movie.imdb_rating.isnot(None))\
         .filter(Movie.netflix_id.isnot(None) if show_only_netflix else True)
-    
-    query = apply_selected_tab_filter(query, selected_tab)
-
-    result = query.group_by(Category.name)\
-                  .all()
 
-    return pd.DataFrame(result, columns=["Genre", "Movie or TV Show Count"])
-
-def get_movies_with_imdb_rating(session, show_only_netflix, selected_tab):
-    query = session.query(Movie.imdb_rating).filter(Movie.imdb_rating.isnot(None))\
-        .filter(Movie.netflix_id.isnot(None) if show_only_netflix else True)
-    
     query = apply_selected_tab_filter(query, selected_tab)
 
-    ratings = query.all()
-    return pd.DataFrame(ratings, columns=["Rating"])
-
-def get_avg_ratings_by_genre(session, selected_tab):
+    return rating_histogram(dict(query.group_by(bucket).all()))
+
+def rating_histogram(counts):
+    """The histogram frame of get_rating_histogram from the title count of each bin number, every bin listed."""
+    low, high = RATING_RANGE
+    width = (high - low) / RATING_BINS
+    starts = [low + width * (number - 1) for number in range(1, RATING_BINS + 1)]
+    return pd.DataFrame({
+        "Rating": [start + width / 2 for start in starts],
+        "Bin Start": starts,
+        "Bin End": [start + width for start in starts],
+        "Count": [counts.get(number, 0) for number in range(1, RATING_BINS + 1)],
+    })
+
+def view_sum(column, condition):
+    # Sums of integers come back as numeric, double precision keeps them out of Python Decimals
+    return cast(func.coalesce(func.sum(column).filter(condition), 0), Float)
+
+def ratio(numerator, denominator):
+    # Averages of groups without values are NaN, like AVG over no rows
+    return numerator / denominator.where(denominator > 0)
+
+@cached_query
+def get_imdb_dashboard(session, show_only_netflix, selected_tab):
+    """Every genre chart of the IMDb analytics page from one GROUPING SETS query over genre_rollup.
+
+    Returns one DataFrame per chart: "avg_rating", "distribution", "avg_runtime", "trending" and "netflix_avg_rating".
+    Only genres with a value are listed, as AVG over their movies would leave the others out.
+    """
+    in_view = GenreRollup.netflix if show_only_netflix else true()
+    netflix_active = and_(GenreRollup.netflix, GenreRollup.cancelled == False)
+    netflix_cancelled = and_(GenreRollup.netflix, GenreRollup.cancelled == True)
     query = session.query(
-        Category.name.label("genre"),
-        func.avg(func.nullif(Movie.imdb_rating, 0)).filter(Movie.cancelled == False).label("avg_rating_active"),
-        func.avg(func.nullif(Movie.imdb_rating, 0)).filter(Movie.cancelled == True).label("avg_rating_cancelled"),
-    ).join(movie_categories, movie_categories.c.category_id == Category.id)\
-     .join(Movie, movie_categories.c.movie_id == Movie.id)\
-     .filter(Movie.imdb_rating.isnot(None))\
-     .filter(Movie.netflix_id.isnot(None))\
-     .group_by(Category.name)\
-     .order_by(Category.name)
-    
-    query = apply_selected_tab_filter(query, selected_tab)
-
-    result = query.all()
-    return pd.DataFrame(result, columns=["Genre", "Avg IMDb Rating (Active)", "Avg IMDb Rating (Cancelled)"])
+        GenreRollup.category,
+        GenreRollup.released_year,
+        func.grouping(GenreRollup.released_year).label("all_years"),
+        view_sum(GenreRollup.movie_count, in_view).label("movie_count"),
+        view_sum(GenreRollup.rating_sum, in_view).label("rating_sum"),
+        view_sum(GenreRollup.rated_count, in_view).label("rated_count"),
+        view_sum(GenreRollup.runtime_sum, in_view).label("runtime_sum"),
+        view_sum(GenreRollup.runtime_count, in_view).label("runtime_count"),
+        # The Netflix active / cancelled chart ignores the checkbox
+        view_sum(GenreRollup.rated_count, GenreRollup.netflix).label("netflix_rated_count"),
+        view_sum(GenreRollup.nonzero_rating_sum, netflix_active).label("active_rating_sum"),
+        view_sum(GenreRollup.nonzero_rated_count, netflix_active).label("active_rated_count"),
+        view_sum(GenreRollup.nonzero_rating_sum, netflix_cancelled).label("cancelled_rating_sum"),
+        view_sum(GenreRollup.nonzero_rated_count, netflix_cancelled).label("cancelled_rated_count"),
+    )
+    query = apply_selected_tab_filter(query, selected_tab, GenreRollup.type)
+    rows = query.group_by(func.grouping_sets(tuple_(GenreRollup.category),
+                                             tuple_(GenreRollup.category, GenreRollup.released_year))).all()
+
+    return dashboard_frames(pd.DataFrame(rows, columns=[column["name"] for column in query.column_descriptions]))
+
+def dashboard_frames(df):
+    """The chart DataFrames of get_imdb_dashboard from the rows of its GROUPING SETS query.
+
+    all_years is 1 on the per-genre rows and 0 on the per-genre-and-year ones.
+    """
+    df = df.assign(released_year=df["released_year"].astype("Int64"))
+    genres = df[df["all_years"] == 1].sort_values("category").reset_index(drop=True)
+    years = df[(df["all_years"] == 0) & (df["movie_count"] > 0)]
+
+    rated = genres[genres["rated_count"] > 0]
+    with_runtime = genres[genres["runtime_count"] > 0]
+    netflix_rated = genres[genres["netflix_rated_count"] > 0]
+    return {
+        "avg_rating": pd.DataFrame({
+            "Genre": rated["category"],
+            "Average IMDb Rating": ratio(rated["rating_sum"], rated["rated_count"]),
+        }).sort_values("Average IMDb Rating", ascending=False, kind="stable").reset_index(drop=True),
+        "distribution": pd.DataFrame({
+            "Genre": genres["category"],
+            "Movie or TV Show Count": genres["movie_count"].astype(int),
+        })[genres["movie_count"] > 0].reset_index(drop=True),
+        "avg_runtime": pd.DataFrame({
+            "Genre": with_runtime["category"],
+            "Average Runtime (Minutes)": ratio(with_runtime["runtime_sum"], with_runtime["runtime_count"]),
+        }).sort_values("Average Runtime (Minutes)", ascending=False, kind="stable").reset_index(drop=True),
+        "trending": pd.DataFrame({
+            "year": years["released_year"],
+            "category": years["category"],
+            "movie_count": years["movie_count"].astype(int),
+        }).sort_values(["year", "movie_count"], ascending=[True, False], kind="stable").reset_index(drop=True),
+        "netflix_avg_rating": pd.DataFrame({
+            "Genre": netflix_rated["category"],
+            "Avg IMDb Rating (Active)": ratio(netflix_rated["active_rating_sum"], netflix_rated["active_rated_count"]),
+            "Avg IMDb Rating (Cancelled)": ratio(netflix_rated["cancelled_rating_sum"],
+                                                 netflix_rated["cancelled_rated_count"]),
+        }).reset_index(drop=True),
+    }
 
 ## FOR STOCKS
 
+@cached_query
 def get_stock_prices(session, company_symbol):
     stock_data = session.query(
         StockPrice.trade_time, StockPrice.close, StockPrice.volume
@@ -126,6 +137,7 @@ def get_stock_prices(session, company_symbol):
 
     return pd.DataFrame(stock_data, columns=["Trade Time", "Close", "Volume"])
 
+@cached_query
 def get_netflix_stock_prices(session):
     stock_data = (
         session.query(StockPrice.trade_time, StockPrice.close, StockPrice.volume, StockPrice.high, StockPrice.low, StockPrice.open)
@@ -138,6 +150,7 @@ def get_netflix_stock_prices(session):
     return df
 
 
+@cached_query
 def get_netflix_releases(session):
     netflix_releases = session.query(
         Movie.released_year, Movie.title
@@ -0,0 +1,156 @@
+import functools
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+# Results of the pages/queries.py functions, kept in SQLite so every gunicorn worker on the host shares them.
+# The data only changes when load_database commits, it then rewrites DATA_VERSION_PATH and all entries
+# stored under the previous version become misses.
+CACHE_PATH = ".cache/query_cache.sqlite"
+DATA_VERSION_PATH = "etl/datasets/data_version"
+# Least recently used entries are evicted beyond this many bytes of pickled results
+MAX_BYTES = 64 * 1024 * 1024
+# Safety net for data changed outside load_database, e.g. by hand in pgAdmin
+TTL_SECONDS = 60 * 60
+# Hits only write to the shared file now and then: each process adds up its hit / miss counts and flushes them
+# at most this often (or with the next put), an entry's last use is only refreshed when older than this
+STATS_FLUSH_SECONDS = 10
+USED_RESOLUTION_SECONDS = 60
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS entries (
+        key TEXT PRIMARY KEY, version TEXT NOT NULL, value BLOB NOT NULL, size INTEGER NOT NULL,
+        stored REAL NOT NULL, used REAL NOT NULL)""",
+    "CREATE INDEX IF NOT EXISTS entries_used ON entries (used)",
+    "CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, count INTEGER NOT NULL)",
+    "INSERT OR IGNORE INTO stats VALUES ('hits', 0), ('misses', 0)",
+]
+EVICT_LEAST_RECENTLY_USED = """
+DELETE FROM entries WHERE key IN (
+    SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY used DESC) AS kept FROM entries) WHERE kept > ?
+)
+"""
+
+local = threading.local()
+
+
+class LookupCounts:
+    """Hits and misses of this process not yet added to the stats table."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.flushed = time.monotonic()
+
+    def record(self, hit):
+        """Count one lookup, returns whether the counts are due to be flushed."""
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return time.monotonic() - self.flushed >= STATS_FLUSH_SECONDS
+
+    def take(self):
+        with self.lock:
+            counts = {"hits": self.hits, "misses": self.misses}
+            self.hits = self.misses = 0
+            self.flushed = time.monotonic()
+        return counts
+
+lookup_counts = LookupCounts()
+
+
+def data_version():
+    """The stamp load_database wrote after its last commit, "" before the first load."""
+    try:
+        with open(DATA_VERSION_PATH) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return ""
+
+def connect():
+    # One connection per thread, sqlite3 connections must not cross threads
+    connection = getattr(local, "connection", None)
+    if connection is None:
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        connection = sqlite3.connect(CACHE_PATH, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        # A lost last commit after a power cut only costs cache entries, no fsync on every one
+        connection.execute("PRAGMA synchronous=NORMAL")
+        with connection:
+            for statement in SCHEMA:
+                connection.execute(statement)
+        local.connection = connection
+    return connection
+
+def flush_counts(connection):
+    """Add this process's lookup counts to the stats table, inside the caller's transaction."""
+    counts = lookup_counts.take()
+    connection.executemany("UPDATE stats SET count = count + ? WHERE name = ?",
+                           [(count, name) for name, count in counts.items() if count])
+
+def cache_get(key, version):
+    connection = connect()
+    now = time.time()
+    row = connection.execute("SELECT value, used FROM entries WHERE key = ? AND version = ? AND stored > ?",
+                             (key, version, now - TTL_SECONDS)).fetchone()
+    flush_due = lookup_counts.record(row is not None)
+    refresh_used = row is not None and now - row[1] >= USED_RESOLUTION_SECONDS
+    # Most hits are read-only, the write lock is only taken to flush the counts or age an entry's last use
+    if flush_due or refresh_used:
+        with connection:
+            if refresh_used:
+                connection.execute("UPDATE entries SET used = ? WHERE key = ?", (now, key))
+            if flush_due:
+                flush_counts(connection)
+    return pickle.loads(row[0]) if row else None
+
+def cache_put(key, version, value):
+    blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    if len(blob) > MAX_BYTES:
+        return
+    connection = connect()
+    with connection:
+        connection.execute("DELETE FROM entries WHERE version != ?", (version,))
+        now = time.time()
+        connection.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                           (key, version, blob, len(blob), now, now))
+        connection.execute(EVICT_LEAST_RECENTLY_USED, (MAX_BYTES,))
+        flush_counts(connection)
+
+def cached_query(query):
+    """Serve query(session, *args) from the cache while the data version is unchanged.
+
+    The session is not part of the key and is not touched on a hit, a read_session scope then never connects.
+    """
+    @functools.wraps(query)
+    def wrapper(session, *args):
+        key = f"{query.__module__}.{query.__qualname__}{args!r}"
+        version = data_version()
+        result = cache_get(key, version)
+        if result is None:
+            result = query(session, *args)
+            cache_put(key, version, result)
+        return result
+    return wrapper
+
+def cache_stats():
+    connection = connect()
+    with connection:
+        flush_counts(connection)
+    counts = dict(connection.execute("SELECT name, count FROM stats"))
+    entries, size = connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+    lookups = counts["hits"] + counts["misses"]
+    return {
+        "hits": counts["hits"],
+        "misses": counts["misses"],
+        "hit_rate": counts["hits"] / lookups if lookups else 0.0,
+        "entries": entries,
+        "bytes": size,
+        "max_bytes": MAX_BYTES,
+        "data_version": data_version(),
+    }
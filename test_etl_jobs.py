@@ -0,0 +1,99 @@
+import fcntl
+import json
+import os
+import threading
+
+import pytest
+
+import etl_jobs
+
+
+@pytest.fixture
+def job_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(etl_jobs, "JOB_DIR", str(tmp_path))
+    monkeypatch.setattr(etl_jobs, "LOCK_PATH", str(tmp_path / "etl_job.lock"))
+    monkeypatch.setattr(etl_jobs, "EVENTS_PATH", str(tmp_path / "etl_job.events"))
+    monkeypatch.setattr(etl_jobs, "LOG_PATH", str(tmp_path / "etl_job.log"))
+    monkeypatch.setattr(etl_jobs, "START_TIMEOUT_SECONDS", 0.2)
+    return tmp_path
+
+@pytest.fixture
+def jobs_started(job_dir, monkeypatch):
+    started = []
+    monkeypatch.setattr(etl_jobs.subprocess, "Popen", lambda args, **kwargs: started.append(args))
+    return started
+
+def hold_lock(operation):
+    fd = etl_jobs.open_lock()
+    fcntl.flock(fd, operation)
+    return fd
+
+def write_events(*events):
+    with open(etl_jobs.EVENTS_PATH, "w") as f:
+        for event, event_time, fields in events:
+            f.write(json.dumps({"event": event, "time": event_time, **fields}) + "\n")
+
+STARTED = ("started", 101.0, {"tasks": ["gather", "clean", "load"]})
+
+def test_job_status_of_a_running_job(job_dir, monkeypatch):
+    write_events(("queued", 100.0, {}), STARTED, ("task_finished", 105.0, {"task": "gather"}))
+    monkeypatch.setattr(etl_jobs.time, "time", lambda: 110.0)
+    fd = hold_lock(fcntl.LOCK_EX)
+    try:
+        status = etl_jobs.job_status()
+    finally:
+        os.close(fd)
+
+    assert status["state"] == "running"
+    assert status["tasks"] == [
+        {"name": "gather", "status": "finished", "duration": 4.0},
+        {"name": "clean", "status": "running", "duration": 5.0},
+        {"name": "load", "status": "pending", "duration": None},
+    ]
+    assert (status["done"], status["elapsed"], status["error"]) == (1, 10.0, None)
+
+def test_job_status_of_ended_jobs(job_dir):
+    assert etl_jobs.job_status()["state"] == "idle"
+
+    write_events(("queued", 100.0, {}), STARTED, ("task_finished", 102.0, {"task": "gather"}),
+                 ("task_failed", 104.0, {"task": "clean"}), ("failed", 104.5, {"error": "clean failed"}))
+    status = etl_jobs.job_status()
+    assert (status["state"], status["done"], status["elapsed"], status["error"]) == ("failed", 1, 4.5, "clean failed")
+    assert [task["status"] for task in status["tasks"]] == ["finished", "failed", "pending"]
+
+    write_events(("queued", 100.0, {}), STARTED, ("task_finished", 102.0, {"task": "gather"}),
+                 ("task_finished", 103.0, {"task": "clean"}), ("task_finished", 106.0, {"task": "load"}),
+                 ("finished", 106.0, {}))
+    status = etl_jobs.job_status()
+    assert (status["state"], status["done"], status["elapsed"], status["error"]) == ("succeeded", 3, 6.0, None)
+
+def test_job_status_of_a_job_that_died(job_dir):
+    # Killed before its last event, it no longer holds the lock
+    write_events(("queued", 100.0, {}), STARTED, ("task_finished", 102.0, {"task": "gather"}))
+    status = etl_jobs.job_status()
+    assert status["state"] == "failed"
+    assert status["error"] == "Interrupted, see " + etl_jobs.LOG_PATH
+
+def test_start_job_is_single_flight(jobs_started):
+    assert etl_jobs.start_job()
+    assert len(jobs_started) == 1
+    assert [event["event"] for event in etl_jobs.read_events()] == ["queued"]
+
+    # The started job holds the lock until it exits, clicks meanwhile join it
+    fd = hold_lock(fcntl.LOCK_EX)
+    try:
+        assert etl_jobs.is_running()
+        assert not etl_jobs.start_job()
+    finally:
+        os.close(fd)
+    assert len(jobs_started) == 1
+    assert not etl_jobs.is_running()
+
+def test_start_job_waits_for_status_probes(jobs_started):
+    probe = hold_lock(fcntl.LOCK_SH)
+    # Probes only share the lock, they never see each other as a running job
+    assert not etl_jobs.is_running()
+    threading.Timer(0.05, os.close, (probe,)).start()
+
+    assert etl_jobs.start_job()
+    assert len(jobs_started) == 1
@@ -0,0 +1,190 @@
+import math
+import os
+import sys
+
+import pandas as pd
+import pytest
+from sqlalchemy import column, create_engine, insert, select, text, values
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from database import DATABASE_URL
+from pages.queries import RATING_BINS, dashboard_frames, get_imdb_dashboard, rating_bin, rating_histogram
+
+# After the repository root, db_schema stays the dashboard's own
+sys.path.append(os.path.join(os.path.dirname(__file__), "etl"))
+import load_database
+
+COLUMNS = ["category", "released_year", "all_years", "movie_count", "rating_sum", "rated_count", "runtime_sum",
+           "runtime_count", "netflix_rated_count", "active_rating_sum", "active_rated_count", "cancelled_rating_sum",
+           "cancelled_rated_count"]
+
+# GROUPING SETS rows of a small catalog: two Drama titles from 2000 (one of them a cancelled Netflix title rated 8),
+# one Drama from 2001 rated 6, two unrated Comedies from 2001 with one runtime and a Horror only outside Netflix
+ALL_TITLES = pd.DataFrame([
+    ("Comedy", None, 1, 2, 0.0, 0, 90.0, 1, 0, 0.0, 0, 0.0, 0),
+    ("Comedy", 2001, 0, 2, 0.0, 0, 90.0, 1, 0, 0.0, 0, 0.0, 0),
+    ("Drama", None, 1, 3, 21.0, 3, 300.0, 3, 1, 0.0, 0, 8.0, 1),
+    ("Drama", 2000, 0, 2, 15.0, 2, 200.0, 2, 1, 0.0, 0, 8.0, 1),
+    ("Drama", 2001, 0, 1, 6.0, 1, 100.0, 1, 0, 0.0, 0, 0.0, 0),
+    ("Horror", None, 1, 1, 5.0, 1, 80.0, 1, 0, 0.0, 0, 0.0, 0),
+    ("Horror", 2000, 0, 1, 5.0, 1, 80.0, 1, 0, 0.0, 0, 0.0, 0),
+], columns=COLUMNS)
+# The same catalog with "Show only Netflix": the groups stay, the sums outside the view are 0
+NETFLIX_ONLY = pd.DataFrame([
+    ("Comedy", None, 1, 0, 0.0, 0, 0.0, 0, 0, 0.0, 0, 0.0, 0),
+    ("Comedy", 2001, 0, 0, 0.0, 0, 0.0, 0, 0, 0.0, 0, 0.0, 0),
+    ("Drama", None, 1, 1, 8.0, 1, 120.0, 1, 1, 0.0, 0, 8.0, 1),
+    ("Drama", 2000, 0, 1, 8.0, 1, 120.0, 1, 1, 0.0, 0, 8.0, 1),
+    ("Drama", 2001, 0, 0, 0.0, 0, 0.0, 0, 0, 0.0, 0, 0.0, 0),
+    ("Horror", None, 1, 0, 0.0, 0, 0.0, 0, 0, 0.0, 0, 0.0, 0),
+    ("Horror", 2000, 0, 0, 0.0, 0, 0.0, 0, 0, 0.0, 0, 0.0, 0),
+], columns=COLUMNS)
+
+def records(df):
+    return [tuple(None if isinstance(value, float) and math.isnan(value) else value for value in row)
+            for row in df.itertuples(index=False)]
+
+def test_dashboard_frames_of_all_titles():
+    frames = dashboard_frames(ALL_TITLES)
+
+    # Comedy has no rated titles, it has no average rating rather than 0
+    assert records(frames["avg_rating"]) == [("Drama", 7.0), ("Horror", 5.0)]
+    assert records(frames["distribution"]) == [("Comedy", 2), ("Drama", 3), ("Horror", 1)]
+    assert records(frames["avg_runtime"]) == [("Drama", 100.0), ("Comedy", 90.0), ("Horror", 80.0)]
+    assert records(frames["trending"]) == [(2000, "Drama", 2), (2000, "Horror", 1), (2001, "Comedy", 2),
+                                           (2001, "Drama", 1)]
+    assert records(frames["netflix_avg_rating"]) == [("Drama", None, 8.0)]
+
+def test_dashboard_frames_of_netflix_titles():
+    frames = dashboard_frames(NETFLIX_ONLY)
+
+    # Groups without a title in the view are left out of every chart
+    assert records(frames["avg_rating"]) == [("Drama", 8.0)]
+    assert records(frames["distribution"]) == [("Drama", 1)]
+    assert records(frames["avg_runtime"]) == [("Drama", 120.0)]
+    assert records(frames["trending"]) == [(2000, "Drama", 1)]
+    assert records(frames["netflix_avg_rating"]) == records(dashboard_frames(ALL_TITLES)["netflix_avg_rating"])
+    assert str(frames["trending"]["year"].dtype) == "Int64"
+
+def test_rating_histogram_lists_every_bin():
+    histogram = rating_histogram({1: 3, 11: 2, RATING_BINS: 4})
+
+    assert len(histogram) == RATING_BINS
+    assert histogram["Count"].sum() == 9
+    assert records(histogram.iloc[[0, 1, 10, 19]]) == [(0.25, 0.0, 0.5, 3), (0.75, 0.5, 1.0, 0), (5.25, 5.0, 5.5, 2),
+                                                       (9.75, 9.5, 10.0, 4)]
+
+def test_rating_bin_edges():
+    # width_bucket / least only exist in PostgreSQL, checked on the development database when it is running
+    engine = create_engine(DATABASE_URL, connect_args={"connect_timeout": 2})
+    ratings = [0.0, 0.49, 0.5, 5.0, 9.49, 9.5, 10.0]
+    rows = values(column("rating"), name="ratings").data([(rating,) for rating in ratings])
+    try:
+        with engine.connect() as connection:
+            bins = connection.execute(select(rating_bin(rows.c.rating))).scalars().all()
+    except OperationalError:
+        pytest.skip("no PostgreSQL database to run width_bucket on")
+    finally:
+        engine.dispose()
+
+    # Every bin includes its start, 10.0 is counted in the last bin instead of an overflow bin
+    assert bins == [1, 1, 2, 11, 19, 20, RATING_BINS]
+
+# Per-movie fixture: type, netflix_id, cancelled, released_year, imdb_rating, runtime_minutes, genres
+MOVIES = pd.DataFrame([
+    ("movie", None, False, 2000, 7.0, 100, ["Drama", "Comedy"]),
+    ("movie", 11, False, 2001, 8.0, None, ["Drama"]),
+    ("tvSeries", 12, True, 2001, 0.0, 50, ["Drama"]),
+    ("tvSeries", 13, True, 2002, None, 40, ["Horror"]),
+    ("movie", None, False, 2002, None, None, ["Comedy"]),
+    ("movie", 14, False, 2000, 6.0, 90, ["Comedy"]),
+    ("tvSeries", 15, False, None, 9.0, 30, ["Drama", "Horror"]),
+    ("tvSeries", None, False, 1999, 4.5, 20, ["Documentary"]),
+], columns=["type", "netflix_id", "cancelled", "released_year", "imdb_rating", "runtime_minutes", "genres"])
+
+@pytest.fixture
+def rollup_session():
+    """A session on a throwaway schema of the development database, with MOVIES loaded and the rollup built."""
+    engine = create_engine(DATABASE_URL, connect_args={"connect_timeout": 2})
+    schema = f"test_genre_rollup_{os.getpid()}"
+    try:
+        connection = engine.connect()
+    except OperationalError:
+        engine.dispose()
+        pytest.skip("no PostgreSQL database to build the rollup on")
+    connection.execute(text(f"CREATE SCHEMA {schema}"))
+    connection.commit()
+    connection.execute(text(f"SET search_path TO {schema}"))
+    try:
+        load_database.Base.metadata.create_all(connection)
+        categories = sorted({genre for genres in MOVIES["genres"] for genre in genres})
+        connection.execute(insert(load_database.Category), [{"id": number, "name": name}
+                                                             for number, name in enumerate(categories, start=1)])
+        movies = MOVIES.drop(columns="genres").astype(object).where(MOVIES.notna(), None)
+        connection.execute(insert(load_database.Movie), [{"id": number, "title": f"Title {number}", **row}
+                                                         for number, row in enumerate(movies.to_dict("records"), 1)])
+        connection.execute(insert(load_database.movie_categories), [
+            {"movie_id": number, "category_id": categories.index(genre) + 1}
+            for number, genres in enumerate(MOVIES["genres"], start=1) for genre in genres])
+        for statement in load_database.REBUILD_GENRE_ROLLUP:
+            connection.execute(text(statement.format(suffix="")))
+        with Session(bind=connection) as session:
+            yield session
+    finally:
+        connection.rollback()
+        connection.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+        connection.commit()
+        connection.close()
+        engine.dispose()
+
+def per_movie_frames(show_only_netflix, selected_tab):
+    """The charts of get_imdb_dashboard aggregated straight from MOVIES, genres without a value left out."""
+    movies = MOVIES.explode("genres").rename(columns={"genres": "genre"})
+    movies = movies[movies["type"] == {"movies": "movie", "tv-shows": "tvSeries"}[selected_tab]] \
+        if selected_tab in ("movies", "tv-shows") else movies
+    netflix = movies[movies["netflix_id"].notna()]
+    in_view = netflix if show_only_netflix else movies
+    by_genre = in_view.groupby("genre")
+
+    def nonzero_average(cancelled):
+        rated = netflix[(netflix["cancelled"] == cancelled) & (netflix["imdb_rating"] != 0)]
+        return rated.groupby("genre")["imdb_rating"].mean()
+
+    netflix_genres = netflix[netflix["imdb_rating"].notna()]["genre"].unique()
+    return {
+        "avg_rating": by_genre["imdb_rating"].mean().dropna().to_dict(),
+        "distribution": by_genre.size().to_dict(),
+        "avg_runtime": by_genre["runtime_minutes"].mean().dropna().to_dict(),
+        "trending": in_view.groupby(["released_year", "genre"], dropna=False).size().to_dict(),
+        "netflix_avg_rating": {genre: (nonzero_average(False).get(genre), nonzero_average(True).get(genre))
+                               for genre in netflix_genres},
+    }
+
+def rollup_frames(session, show_only_netflix, selected_tab):
+    frames = get_imdb_dashboard.__wrapped__(session, show_only_netflix, selected_tab)
+    def year(value):
+        return None if pd.isna(value) else value
+    return {
+        "avg_rating": dict(records(frames["avg_rating"])),
+        "distribution": dict(records(frames["distribution"])),
+        "avg_runtime": dict(records(frames["avg_runtime"])),
+        "trending": {(year(released_year), genre): count for released_year, genre, count in records(frames["trending"])},
+        "netflix_avg_rating": {genre: (active, cancelled)
+                               for genre, active, cancelled in records(frames["netflix_avg_rating"])},
+    }
+
+def rounded(values):
+    if isinstance(values, dict):
+        return {rounded(key): rounded(value) for key, value in values.items()}
+    if isinstance(values, tuple):
+        return tuple(map(rounded, values))
+    if values is None or (isinstance(values, float) and math.isnan(values)):
+        return None
+    return round(float(values), 6) if isinstance(values, float) else values
+
+@pytest.mark.parametrize("show_only_netflix", [False, True])
+@pytest.mark.parametrize("selected_tab", ["all", "movies", "tv-shows"])
+def test_rollup_charts_match_per_movie_aggregates(rollup_session, show_only_netflix, selected_tab):
+    expected = per_movie_frames(show_only_netflix, selected_tab)
+    assert rounded(rollup_frames(rollup_session, show_only_netflix, selected_tab)) == rounded(expected)
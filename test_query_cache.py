@@ -0,0 +1,104 @@
+import pickle
+import threading
+
+import pytest
+
+import query_cache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(query_cache, "CACHE_PATH", str(tmp_path / "cache" / "query_cache.sqlite"))
+    monkeypatch.setattr(query_cache, "DATA_VERSION_PATH", str(tmp_path / "data_version"))
+    monkeypatch.setattr(query_cache, "local", threading.local())
+    monkeypatch.setattr(query_cache, "lookup_counts", query_cache.LookupCounts())
+    yield tmp_path
+    query_cache.connect().close()
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(query_cache.time, "time", lambda: now[0])
+    return now
+
+def set_data_version(cache, version):
+    (cache / "data_version").write_text(version)
+
+def counted_query():
+    calls = []
+
+    @query_cache.cached_query
+    def get_titles(session, selected_tab):
+        calls.append(selected_tab)
+        return [selected_tab] * 3
+
+    return get_titles, calls
+
+def stored_keys():
+    return {key for key, in query_cache.connect().execute("SELECT key FROM entries")}
+
+def test_repeated_lookups_are_served_from_the_cache(cache):
+    get_titles, calls = counted_query()
+
+    assert get_titles(None, "movies") == ["movies"] * 3
+    assert get_titles(None, "movies") == ["movies"] * 3
+    assert get_titles(None, "tv-shows") == ["tv-shows"] * 3
+
+    assert calls == ["movies", "tv-shows"]
+    stats = query_cache.cache_stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 2)
+
+def test_new_data_version_invalidates_entries(cache):
+    get_titles, calls = counted_query()
+    set_data_version(cache, "1")
+    get_titles(None, "movies")
+    get_titles(None, "movies")
+
+    set_data_version(cache, "2")
+    get_titles(None, "movies")
+
+    assert calls == ["movies", "movies"]
+    # Storing under the new version drops everything stored under older ones
+    assert query_cache.connect().execute("SELECT version FROM entries").fetchall() == [("2",)]
+
+def test_entries_expire_after_ttl(cache, clock):
+    get_titles, calls = counted_query()
+    get_titles(None, "movies")
+
+    clock[0] += query_cache.TTL_SECONDS - 1
+    get_titles(None, "movies")
+    clock[0] += 2
+    get_titles(None, "movies")
+
+    assert calls == ["movies", "movies"]
+
+def test_least_recently_used_entries_are_evicted(cache, clock, monkeypatch):
+    value = b"x" * 1000
+    size = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    monkeypatch.setattr(query_cache, "MAX_BYTES", 3 * size)
+    for key in ["a", "b", "c"]:
+        clock[0] += 1
+        query_cache.cache_put(key, "", value)
+
+    # A use only counts once the last recorded one is older than USED_RESOLUTION_SECONDS
+    clock[0] += query_cache.USED_RESOLUTION_SECONDS
+    assert query_cache.cache_get("a", "") == value
+    clock[0] += 1
+    query_cache.cache_put("d", "", value)
+
+    assert stored_keys() == {"a", "c", "d"}
+
+def test_hits_write_nothing_until_due(cache, clock, monkeypatch):
+    query_cache.cache_put("a", "", 1)
+    writes = []
+    query_cache.connect().set_trace_callback(
+        lambda statement: writes.append(statement) if statement.startswith("UPDATE") else None)
+
+    for _ in range(5):
+        assert query_cache.cache_get("a", "") == 1
+    assert writes == []
+
+    monkeypatch.setattr(query_cache, "STATS_FLUSH_SECONDS", 0)
+    query_cache.cache_get("a", "")
+    assert len(writes) == 1
+    assert query_cache.cache_stats()["hits"] == 6